@@ -8,19 +8,27 @@ PyWebView + Flask Implementation
 import os
 import sys
 import json
+import asyncio
+import hashlib
 import tempfile
 import threading
 import webbrowser
 import uuid
 import time
 from pathlib import Path
+from urllib.parse import quote
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Optional, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
 import base64
 import zipfile
 import io
+import itertools
+import re
+import xml.etree.ElementTree as ET
 
 # Windows 控制台编码修复
 if sys.platform == 'win32':
@@ -32,12 +40,23 @@ if sys.platform == 'win32':
     # 设置环境变量
     os.environ['PYTHONIOENCODING'] = 'utf-8'
 
-from flask import Flask, request, jsonify, send_file, Response
+from flask import Flask, request, send_file, Response
 from flask_cors import CORS
 
+try:
+    import orjson  # 可选依赖，状态轮询等高频接口的 JSON 编码更快
+except ImportError:
+    orjson = None
+
 # 导入核心模块
-from resume_parser import extract_text_from_resume, parse_resume_with_llm
-from resume_template_generator import ResumeTemplateGenerator
+from resume_parser import (
+    extract_text_from_resume,
+    parse_resume_with_llm_async,
+    get_cached_result_for_file,
+    cache_result_for_file,
+    warm_up
+)
+from resume_template_generator import generate_excel_bytes, preload_template
 from license_manager import (
     get_license_manager, 
     validate_license, 
@@ -68,14 +87,81 @@ static_folder = get_resource_path('static')
 templates_folder = get_resource_path('Templates')
 
 app = Flask(__name__, static_folder=static_folder, static_url_path='')
+# 本地应用，静态文件和下载都不做强缓存，依赖 ETag / Last-Modified 协商
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
+# 单次上传大小上限，超过时直接拒绝，不读取请求体
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_MB', 50)) * 1024 * 1024
 CORS(app)
 
-# 全局任务存储
-tasks = {}
+# 全局任务存储（按创建顺序排列）。已结束的任务超过上限时从最早的开始淘汰，
+# 避免长时间运行后任务状态、解析结果和生成的文件无限累积
+tasks = OrderedDict()
+MAX_TASKS = int(os.getenv('MAX_TASKS', 500))
 template_path = Path(templates_folder) / "template.xlsx"
 
+# 生成的 Excel 统一放在一个临时目录中，删除任务时删除对应文件，程序退出时整个目录自动清理
+output_dir = tempfile.TemporaryDirectory(prefix='cyber_resume_')
+
 # 并行处理配置
-MAX_PARALLEL_WORKERS = 3  # 最大并行数，避免 API 限流
+MAX_PARALLEL_WORKERS = int(os.getenv('MAX_PARALLEL_WORKERS', 3))  # 最大并行数，避免 API 限流
+
+# 处理结果缓存：文件 SHA-256 -> (解析结果, Excel 内容, 预览 JSON)，重复上传同一文件时直接复用
+RESULT_CACHE_SIZE = 32
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
+# 一份简历解析结果 JSON 的大致长度，用于估算 AI 解析阶段的进度
+EXPECTED_RESPONSE_CHARS = 3000
+
+# 后台事件循环：所有任务在同一个事件循环中并发处理，AI 调用共用一个异步连接池；
+# 信号量全局共享，多次点击"开始处理"时总并发数仍不超过 MAX_PARALLEL_WORKERS。
+# 信号量在事件循环线程中首次使用时创建（见 _get_semaphore）
+_loop = None
+_loop_lock = threading.Lock()
+_semaphore = None
+
+# 流水线的 CPU 阶段各用独立的线程池：AI 调用排队时，其他任务的文本提取和
+# Excel 预览生成照常进行，且两个阶段互不抢占线程
+STAGE_WORKERS = min(4, os.cpu_count() or 1)
+_extract_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix='extract')
+_excel_executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix='excel')
+
+# Excel 生成是纯 Python 的 CPU 密集操作，线程间受 GIL 限制无法并行，放到独立进程中执行。
+# 进程池在第一次生成 Excel 时才创建，避免子进程导入本模块时再次创建
+_excel_process_pool = None
+_excel_process_pool_lock = threading.Lock()
+
+
+def _get_excel_process_pool():
+    """获取 Excel 生成进程池（首次调用时创建）"""
+    global _excel_process_pool
+    with _excel_process_pool_lock:
+        if _excel_process_pool is None:
+            # 每个子进程启动时先把模板读入内存，第一份简历也无需读盘
+            _excel_process_pool = ProcessPoolExecutor(
+                max_workers=STAGE_WORKERS,
+                initializer=preload_template,
+                initargs=(str(template_path),)
+            )
+        return _excel_process_pool
+
+
+def _get_loop():
+    """获取后台事件循环，首次调用时在守护线程中启动"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='resume-loop', daemon=True).start()
+        return _loop
+
+
+def _get_semaphore():
+    """获取 AI 调用并发信号量（只在后台事件循环线程中调用，首次使用时创建）"""
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_PARALLEL_WORKERS)
+    return _semaphore
 
 
 @dataclass
@@ -90,12 +176,118 @@ class Task:
     remaining_quota: Optional[str] = None  # 剩余配额，用于前端实时更新
     
     def to_dict(self):
-        return asdict(self)
+        # 字段都是简单类型，直接构造浅拷贝字典，避免 asdict 逐字段递归深拷贝
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result': self.result,
+            'excel_path': self.excel_path,
+            'remaining_quota': self.remaining_quota,
+        }
+
+
+# 任务 JSON 缓存：task_id -> 序列化后的任务状态。
+# 任务状态只能通过 _update_task 修改，修改时使对应缓存失效，
+# 前端轮询时未变化的任务直接复用缓存，无需重新序列化（解析结果可能较大）
+_task_json_cache = {}
+_tasks_lock = threading.RLock()
+
+# 任务列表版本号：任何任务新增、删除或状态变化时加一，用作 /api/tasks 的 ETag，
+# 并通过条件变量唤醒长轮询中的请求
+_tasks_version = 0
+_tasks_changed = threading.Condition(_tasks_lock)
+_tasks_etag_prefix = uuid.uuid4().hex[:8]  # 区分不同进程，避免应用重启后版本号相同导致误判
+
+
+def _tasks_etag() -> str:
+    """当前任务列表的 ETag"""
+    return f'"{_tasks_etag_prefix}-v{_tasks_version}"'
+
+# 长轮询最长等待时间（秒）
+LONG_POLL_TIMEOUT = 25
+
+
+def _bump_tasks_version():
+    """任务列表发生变化（调用方需持有 _tasks_lock）"""
+    global _tasks_version
+    _tasks_version += 1
+    _tasks_changed.notify_all()
+
+
+def _update_task(task, **fields):
+    """修改任务状态（唯一入口），同时使该任务缓存的 JSON 失效"""
+    with _tasks_lock:
+        for name, value in fields.items():
+            setattr(task, name, value)
+        _task_json_cache.pop(task.id, None)
+        _bump_tasks_version()
+        if fields.get('status') in ('completed', 'error'):
+            _evict_finished_tasks()
+
+
+def _evict_finished_tasks():
+    """任务数超过 MAX_TASKS 时，从最早的开始移除已结束的任务及其 Excel 文件（调用方需持有 _tasks_lock）"""
+    if len(tasks) <= MAX_TASKS:
+        return
+    finished = [
+        task_id for task_id, item in tasks.items()
+        if item['task'].status in ('completed', 'error')
+    ]
+    for task_id in finished[:len(tasks) - MAX_TASKS]:
+        item = tasks.pop(task_id)
+        _task_json_cache.pop(task_id, None)
+        if item['task'].excel_path:
+            try:
+                os.unlink(item['task'].excel_path)
+            except OSError:
+                pass
+    _bump_tasks_version()
+
+
+def _task_json(task) -> bytes:
+    """获取任务状态的 JSON（带缓存）"""
+    with _tasks_lock:
+        data = _task_json_cache.get(task.id)
+        if data is None:
+            data = _json_bytes(task.to_dict())
+            _task_json_cache[task.id] = data
+        return data
+
+
+def _json_bytes(payload) -> bytes:
+    """序列化为 JSON（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def _json_response(payload, status=200):
+    """返回 JSON 响应"""
+    return Response(_json_bytes(payload), status=status, mimetype='application/json')
+
+
+# 首页缓存：(文件 mtime, 页面内容, ETag)，页面内联了较大的 CSS/JS，避免每次都读盘
+_index_cache = (None, b'', '')
 
 
 @app.route('/')
 def index():
-    return app.send_static_file('index.html')
+    """首页（内容缓存在内存中，文件修改后自动重新读取；未变化时返回 304）"""
+    global _index_cache
+    index_path = os.path.join(static_folder, 'index.html')
+    mtime = os.stat(index_path).st_mtime_ns
+    if _index_cache[0] != mtime:
+        body = Path(index_path).read_bytes()
+        _index_cache = (mtime, body, hashlib.md5(body).hexdigest())
+    
+    _, body, etag = _index_cache
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 
 @app.route('/favicon.ico')
@@ -103,35 +295,54 @@ def favicon():
     return '', 204  # 返回空响应
 
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """上传文件超过 MAX_CONTENT_LENGTH"""
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return _json_response({'error': f'文件过大，最大支持 {limit_mb}MB'}, 413)
+
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """上传文件"""
     if 'file' not in request.files:
-        return jsonify({'error': '没有文件'}), 400
+        return _json_response({'error': '没有文件'}, 400)
     
     file = request.files['file']
     if file.filename == '':
-        return jsonify({'error': '文件名为空'}), 400
+        return _json_response({'error': '文件名为空'}, 400)
     
     # 检查格式
     suffix = Path(file.filename).suffix.lower()
     if suffix not in ['.pdf', '.docx']:
-        return jsonify({'error': f'不支持的格式: {suffix}'}), 400
+        return _json_response({'error': f'不支持的格式: {suffix}'}, 400)
     
-    # 保存临时文件
-    temp_dir = tempfile.mkdtemp()
-    temp_path = os.path.join(temp_dir, file.filename)
-    file.save(temp_path)
+    # 简历文件通常不足 1MB，直接保存在内存中，解析时无需再写入/读回临时文件。
+    # 分块读取，读取的同时计算哈希，不需要再遍历一遍文件内容
+    hasher = hashlib.sha256()
+    chunks = []
+    for chunk in iter(lambda: file.stream.read(UPLOAD_CHUNK_SIZE), b''):
+        hasher.update(chunk)
+        chunks.append(chunk)
+    file_bytes = b''.join(chunks)
+    file_hash = hasher.hexdigest()
     
     # 创建任务 - 使用 UUID 确保唯一性
     task_id = f"task_{uuid.uuid4().hex[:12]}"
     task = Task(id=task_id, filename=file.filename)
-    tasks[task_id] = {
-        'task': task,
-        'temp_path': temp_path
-    }
+    with _tasks_lock:
+        tasks[task_id] = {
+            'task': task,
+            'file_bytes': file_bytes,
+            'file_hash': file_hash
+        }
+        _bump_tasks_version()
+        _evict_finished_tasks()
     
-    return jsonify({
+    return _json_response({
         'id': task_id,
         'filename': file.filename,
         'status': 'pending'
@@ -140,161 +351,436 @@ def upload_file():
 
 @app.route('/api/tasks', methods=['GET'])
 def get_tasks():
-    """获取所有任务"""
-    return jsonify([t['task'].to_dict() for t in tasks.values()])
+    """
+    获取所有任务
+    
+    支持 ETag 协商：请求头 If-None-Match 与当前版本一致时返回 304；
+    同时带上 ?wait=秒数 时为长轮询，最多等待到任务有变化再返回
+    """
+    client_etag = request.headers.get('If-None-Match')
+    wait = min(request.args.get('wait', 0, type=float), LONG_POLL_TIMEOUT)
+    
+    with _tasks_lock:
+        if client_etag and wait > 0:
+            _tasks_changed.wait_for(lambda: _tasks_etag() != client_etag, timeout=wait)
+        etag = _tasks_etag()
+        if client_etag == etag:
+            return Response(status=304, headers={'ETag': etag})
+        body = b'[' + b','.join(_task_json(t['task']) for t in tasks.values()) + b']'
+    
+    return Response(body, mimetype='application/json', headers={'ETag': etag, 'Cache-Control': 'no-cache'})
 
 
 @app.route('/api/tasks/<task_id>', methods=['DELETE'])
 def delete_task(task_id):
-    """删除任务"""
-    if task_id in tasks:
-        # 清理临时文件
-        temp_path = tasks[task_id].get('temp_path')
-        if temp_path and os.path.exists(temp_path):
-            os.unlink(temp_path)
-        del tasks[task_id]
-    return jsonify({'success': True})
+    """删除任务（处理中的任务会在当前阶段结束后取消，不再继续调用 AI）"""
+    with _tasks_lock:
+        item = tasks.pop(task_id, None)
+        _task_json_cache.pop(task_id, None)
+        _bump_tasks_version()
+    if item:
+        item['cancelled'] = True
+        if item['task'].excel_path:
+            try:
+                os.unlink(item['task'].excel_path)
+            except OSError:
+                pass
+    return _json_response({'success': True})
 
 
 @app.route('/api/process', methods=['POST'])
 def process_files():
     """开始处理所有待处理的任务（并行处理）"""
-    pending_tasks = [t for t in tasks.values() if t['task'].status == 'pending']
+    # 取快照和标记 processing 在同一把锁内完成：上传、淘汰任务的线程会同时修改 tasks，
+    # 且两个并发请求不会取到同一批 pending 任务（否则同一文件会被处理两次、重复扣减配额）
+    with _tasks_lock:
+        pending_tasks = [t for t in tasks.values() if t['task'].status == 'pending']
+        
+        if not pending_tasks:
+            return _json_response({'error': '没有待处理的任务'}, 400)
+        
+        # 立即将任务状态设置为 processing，让前端立即看到变化
+        for item in pending_tasks:
+            _update_task(item['task'], status='processing', progress=2, message='准备中...')
     
-    if not pending_tasks:
-        return jsonify({'error': '没有待处理的任务'}), 400
+    # 在后台事件循环中进行配额检查和处理
+    future = asyncio.run_coroutine_threadsafe(process_all_async(pending_tasks), _get_loop())
+    future.add_done_callback(lambda f: _on_batch_done(f, pending_tasks))
     
+    return _json_response({'message': f'开始并行处理 {len(pending_tasks)} 个文件 (最大并发: {MAX_PARALLEL_WORKERS})'})
+
+
+def _on_batch_done(future, pending_tasks):
+    """一批任务结束时检查未捕获的异常（如配额检查、授权请求出错），避免任务一直停在 processing"""
+    if future.cancelled():
+        error_msg = '处理已取消'
+    elif future.exception() is not None:
+        error = future.exception()
+        print(f"[ERR] Batch processing failed: {error!r}")
+        error_msg = f'处理失败: {error}'
+    else:
+        return
+    for item in pending_tasks:
+        if item['task'].status == 'processing':
+            _update_task(item['task'], status='error', message=error_msg)
+
+
+async def process_all_async(pending_tasks):
+    """检查配额后并发处理一批任务"""
+    total_start = time.time()
     num_tasks = len(pending_tasks)
     
-    # 立即将任务状态设置为 processing，让前端立即看到变化
-    for item in pending_tasks:
-        item['task'].status = 'processing'
-        item['task'].progress = 2
-        item['task'].message = '准备中...'
+    # 先检查并扣减配额
+    license_code = get_local_license()
+    remaining_quota = None
     
-    # 在后台线程中进行配额检查和处理
-    def process_all_parallel():
-        total_start = time.time()
-        
-        # 先检查并扣减配额
-        license_code = get_local_license()
-        remaining_quota = None
-        
-        if license_code:
-            quota_result = consume_quota(license_code, num_tasks)
-            if not quota_result.get('success'):
-                # 配额不足，将所有任务标记为错误
-                error_msg = f"配额不足: {quota_result.get('message', '未知错误')}"
-                for item in pending_tasks:
-                    item['task'].status = 'error'
-                    item['task'].message = error_msg
-                return
-            remaining_quota = quota_result.get('remaining_quota') or str(quota_result.get('remaining', ''))
+    if license_code:
+        quota_result = await asyncio.to_thread(consume_quota, license_code, num_tasks)
+        if not quota_result.get('success'):
+            # 配额不足，将所有任务标记为错误
+            error_msg = f"配额不足: {quota_result.get('message', '未知错误')}"
+            for item in pending_tasks:
+                _update_task(item['task'], status='error', message=error_msg)
+            return
+        remaining_quota = quota_result.get('remaining_quota') or str(quota_result.get('remaining', ''))
+    
+    print(f"\n{'='*60}")
+    print(f"[START] Processing {num_tasks} resumes (max workers: {MAX_PARALLEL_WORKERS})")
+    print(f"{'='*60}")
+    
+    completed_count = 0
+    
+    async def _run(item):
+        nonlocal completed_count
+        task = item['task']
+        try:
+            await process_single_task_async(item, remaining_quota)
+            completed_count += 1
+            print(f"[OK] [{completed_count}/{num_tasks}] {task.filename} done")
+        except Exception as e:
+            completed_count += 1
+            _update_task(task, status='error', message=str(e))
+            print(f"[ERR] [{completed_count}/{num_tasks}] {task.filename} failed: {e}")
+    
+    await asyncio.gather(*(_run(item) for item in pending_tasks))
+    
+    total_time = time.time() - total_start
+    print(f"\n{'='*60}")
+    print(f"[DONE] All completed! Total time: {total_time:.1f}s")
+    print(f"[STAT] Avg: {total_time/num_tasks:.1f}s per resume")
+    print(f"{'='*60}\n")
+
+
+def _is_cancelled(item) -> bool:
+    """任务是否已被用户删除（取消）"""
+    if item.get('cancelled'):
+        print(f"[CANCEL] {item['task'].filename} cancelled")
+        return True
+    return False
+
+
+def _get_cached_result(file_hash):
+    """查询处理结果缓存，返回 (解析结果, Excel 内容, 预览 JSON)，未命中返回 None"""
+    with _result_cache_lock:
+        cached = _result_cache.get(file_hash)
+        if cached is not None:
+            _result_cache.move_to_end(file_hash)
+        return cached
+
+
+def _cache_result(file_hash, result, excel_bytes, preview):
+    """保存处理结果，超出容量时淘汰最久未使用的条目"""
+    with _result_cache_lock:
+        _result_cache[file_hash] = (result, excel_bytes, preview)
+        _result_cache.move_to_end(file_hash)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def _finish_task(task, result, message):
+    """标记任务完成，并在后台上传解析结果到云端"""
+    _update_task(task, progress=100, status='completed', message=message)
+    
+    license_code = get_local_license()
+    if license_code and result:
+        log_resume_result(
+            license_code=license_code,
+            filename=task.filename,
+            result_json=result,
+            status="success"
+        )
+
+
+def _format_preview_value(value) -> str:
+    """单元格值转为预览显示的字符串"""
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):  # 日期类型
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _build_preview(ws) -> bytes:
+    """根据工作表生成前端预览数据（JSON）"""
+    # 读取数据（最多100行）；ws.values 直接返回值元组，不经过单元格对象
+    rows = [
+        [_format_preview_value(value) for value in row]
+        for row in itertools.islice(ws.values, 100)
+    ]
+    
+    # 获取合并单元格信息
+    merged_cells = []
+    for merged_range in ws.merged_cells.ranges:
+        merged_cells.append({
+            'startRow': merged_range.min_row - 1,
+            'endRow': merged_range.max_row - 1,
+            'startCol': merged_range.min_col - 1,
+            'endCol': merged_range.max_col - 1
+        })
+    
+    return _json_bytes({
+        'rows': rows,
+        'mergedCells': merged_cells,
+        'maxCol': ws.max_column
+    })
+
+
+_XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_CELL_REF_RE = re.compile(r'([A-Z]+)(\d+)')
+
+
+def _cell_index(ref):
+    """单元格引用（如 'B3'）转为从 0 开始的 (行, 列)"""
+    letters, number = _CELL_REF_RE.match(ref).groups()
+    col = 0
+    for ch in letters:
+        col = col * 26 + ord(ch) - 64
+    return int(number) - 1, col - 1
+
+
+def _build_preview_from_xlsx(source) -> bytes:
+    """
+    直接流式解析 xlsx 中的工作表 XML 生成预览数据，不经过 openpyxl
+    
+    openpyxl 加载时会为每个单元格创建 Python 对象，这里只读取前 100 行的值和合并单元格信息。
+    只处理本程序生成的文件所用到的单元格类型（共享字符串、内联字符串、数字、布尔），
+    遇到其他情况时抛出异常，由调用方退回 openpyxl
+    """
+    with zipfile.ZipFile(source) as z:
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in z.namelist():
+            with z.open('xl/sharedStrings.xml') as f:
+                for _, si in ET.iterparse(f):
+                    if si.tag == _XLSX_NS + 'si':
+                        shared_strings.append(''.join(t.text or '' for t in si.iter(_XLSX_NS + 't')))
+                        si.clear()
         
-        print(f"\n{'='*60}")
-        print(f"[START] Processing {num_tasks} resumes (max workers: {MAX_PARALLEL_WORKERS})")
-        print(f"{'='*60}")
+        max_row = max_col = 0
+        cells = {}
+        merged_cells = []
+        with z.open('xl/worksheets/sheet1.xml') as f:
+            for _, elem in ET.iterparse(f):
+                tag = elem.tag
+                if tag == _XLSX_NS + 'dimension':
+                    last = elem.get('ref').split(':')[-1]
+                    max_row, max_col = _cell_index(last)
+                    max_row, max_col = max_row + 1, max_col + 1
+                elif tag == _XLSX_NS + 'row':
+                    if int(elem.get('r')) <= 100:  # 最多100行
+                        for c in elem.iter(_XLSX_NS + 'c'):
+                            if c.find(_XLSX_NS + 'f') is not None:
+                                raise ValueError('不支持公式单元格')
+                            cell_type = c.get('t', 'n')
+                            if cell_type == 'inlineStr':
+                                value = ''.join(t.text or '' for t in c.iter(_XLSX_NS + 't'))
+                            else:
+                                v = c.find(_XLSX_NS + 'v')
+                                if v is None or v.text is None:
+                                    continue
+                                if cell_type == 's':
+                                    value = shared_strings[int(v.text)]
+                                elif cell_type == 'str':
+                                    value = v.text
+                                elif cell_type == 'b':
+                                    value = str(v.text == '1')
+                                elif cell_type == 'n' and c.get('s') in (None, '0'):
+                                    # 与 openpyxl 一致：含小数点或指数的按浮点数处理
+                                    value = str(float(v.text)) if '.' in v.text or 'E' in v.text else str(int(v.text))
+                                else:
+                                    # 带样式的数字可能是日期，交给 openpyxl 处理
+                                    raise ValueError('不支持的单元格类型')
+                            cells[_cell_index(c.get('r'))] = value
+                    elem.clear()
+                elif tag == _XLSX_NS + 'mergeCell':
+                    start, end = elem.get('ref').split(':')
+                    start_row, start_col = _cell_index(start)
+                    end_row, end_col = _cell_index(end)
+                    merged_cells.append({
+                        'startRow': start_row,
+                        'endRow': end_row,
+                        'startCol': start_col,
+                        'endCol': end_col
+                    })
+    
+    rows = [
+        [cells.get((r, c), '') for c in range(max_col)]
+        for r in range(min(max_row, 100))
+    ]
+    return _json_bytes({
+        'rows': rows,
+        'mergedCells': merged_cells,
+        'maxCol': max_col
+    })
+
+
+def _load_preview(source) -> bytes:
+    """生成 Excel 预览数据：优先流式解析 XML，不支持的内容退回 openpyxl"""
+    from openpyxl import load_workbook
+    
+    try:
+        return _build_preview_from_xlsx(source)
+    except Exception:
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return _build_preview(load_workbook(source).active)
+
+
+def _write_file(path, data):
+    """写入文件"""
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+async def _extract_and_parse(item, timing):
+    """
+    提取文本并调用 AI 解析
+    
+    Returns:
+        解析结果；任务在此期间被取消时返回 None
+    """
+    loop = asyncio.get_running_loop()
+    task = item['task']
+    
+    _update_task(task, progress=10, message='正在提取文本...')
+    
+    # 提取文本
+    t0 = time.time()
+    # 上传内容只在提取文本时使用一次，取出后不再随任务常驻内存
+    text = await loop.run_in_executor(_extract_executor, extract_text_from_resume, task.filename, item.pop('file_bytes'))
+    timing['text_extraction'] = time.time() - t0
+    print(f"[PERF] Text extraction: {timing['text_extraction']:.2f}s")
+    
+    if _is_cancelled(item):
+        return None
+    
+    _update_task(task, progress=20, message='等待 AI 解析...')
+    
+    # AI 解析（流式接收，进度在 30% ~ 65% 之间随已接收内容推进）
+    def on_llm_progress(received):
+        _update_task(
+            task,
+            progress=30 + min(35, received * 35 // EXPECTED_RESPONSE_CHARS),
+            message=f'正在调用 AI 解析... 已接收 {received} 字符'
+        )
+    
+    async with _get_semaphore():
+        if _is_cancelled(item):
+            return None
         
-        # 使用线程池并行处理
-        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_WORKERS) as executor:
-            # 提交所有任务（传入剩余配额信息）
-            future_to_task = {
-                executor.submit(process_single_task, item, remaining_quota): item 
-                for item in pending_tasks
-            }
-            
-            # 等待任务完成并处理结果
-            completed_count = 0
-            for future in as_completed(future_to_task):
-                item = future_to_task[future]
-                task = item['task']
-                completed_count += 1
-                try:
-                    future.result()  # 获取结果，捕获异常
-                    print(f"[OK] [{completed_count}/{num_tasks}] {task.filename} done")
-                except Exception as e:
-                    task.status = 'error'
-                    task.message = str(e)
-                    print(f"[ERR] [{completed_count}/{num_tasks}] {task.filename} failed: {e}")
+        _update_task(task, progress=30, message='正在调用 AI 解析...')
         
-        total_time = time.time() - total_start
-        print(f"\n{'='*60}")
-        print(f"[DONE] All completed! Total time: {total_time:.1f}s")
-        print(f"[STAT] Avg: {total_time/num_tasks:.1f}s per resume")
-        print(f"{'='*60}\n")
+        t0 = time.time()
+        result = await parse_resume_with_llm_async(text, on_progress=on_llm_progress)
+        timing['ai_parsing'] = time.time() - t0
+        print(f"[PERF] AI parsing: {timing['ai_parsing']:.2f}s")
     
-    thread = threading.Thread(target=process_all_parallel)
-    thread.start()
+    if _is_cancelled(item):
+        return None
     
-    return jsonify({'message': f'开始并行处理 {len(pending_tasks)} 个文件 (最大并发: {MAX_PARALLEL_WORKERS})'})
+    return result
 
 
-def process_single_task(item, remaining_quota=None):
-    """处理单个任务"""
+async def process_single_task_async(item, remaining_quota=None):
+    """
+    处理单个任务（每个阶段开始前检查任务是否已被取消）
+    
+    文本提取在线程池、Excel 生成在进程池中执行，AI 调用在事件循环中异步进行，
+    只有 AI 调用受 MAX_PARALLEL_WORKERS 限制
+    """
+    loop = asyncio.get_running_loop()
     task = item['task']
-    temp_path = item['temp_path']
     timing = {}  # 性能计时
     
     try:
         total_start = time.time()
         
+        if _is_cancelled(item):
+            return
+        
         # 配额已在 process_files 中一次性扣减，这里更新显示
         if remaining_quota:
-            task.remaining_quota = remaining_quota
+            _update_task(task, remaining_quota=remaining_quota)
         
-        task.progress = 10
-        task.message = '正在提取文本...'
+        # 内容完全相同的文件之前处理过：直接复用解析结果和 Excel
+        cached = _get_cached_result(item['file_hash'])
+        if cached is not None:
+            item.pop('file_bytes', None)
+            result, excel_bytes, item['preview'] = cached
+            excel_path = os.path.join(output_dir.name, f"{task.id}.xlsx")
+            await asyncio.to_thread(_write_file, excel_path, excel_bytes)
+            _update_task(task, result=result, excel_path=excel_path)
+            print(f"[CACHE] {task.filename} reused previous result")
+            _finish_task(task, result, '处理完成 (相同文件，复用上次结果)')
+            return
         
-        # 提取文本
-        t0 = time.time()
-        text = extract_text_from_resume(temp_path)
-        timing['text_extraction'] = time.time() - t0
-        print(f"[PERF] Text extraction: {timing['text_extraction']:.2f}s")
+        # 之前（包括上次运行时）解析过内容相同的文件：跳过文本提取和 AI 调用，只重新生成 Excel
+        result = await asyncio.to_thread(get_cached_result_for_file, item['file_hash'])
+        if result is not None:
+            item.pop('file_bytes', None)
+            timing['text_extraction'] = timing['ai_parsing'] = 0.0
+            print(f"[CACHE] {task.filename} reused parsed result")
+        else:
+            result = await _extract_and_parse(item, timing)
+            if result is None:
+                return
+            if 'error' not in result:
+                await asyncio.to_thread(cache_result_for_file, item['file_hash'], result)
         
-        task.progress = 30
-        task.message = '正在调用 AI 解析...'
+        # 重试后仍失败（或返回内容不是 JSON）时直接报错，不生成空白 Excel
+        if 'error' in result:
+            raise RuntimeError(f"AI 解析失败: {result['error']}")
         
-        # AI 解析
-        t0 = time.time()
-        result = parse_resume_with_llm(text)
-        timing['ai_parsing'] = time.time() - t0
-        print(f"[PERF] AI parsing: {timing['ai_parsing']:.2f}s")
-        
-        task.progress = 70
-        task.result = result
-        task.message = '正在生成 Excel...'
+        _update_task(task, progress=70, result=result, message='正在生成 Excel...')
         
         # 生成 Excel
         t0 = time.time()
-        generator = ResumeTemplateGenerator(str(template_path))
-        excel_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx')
-        generator.generate(result, excel_temp.name)
+        excel_bytes = await loop.run_in_executor(
+            _get_excel_process_pool(), generate_excel_bytes, str(template_path), result
+        )
+        # 预览数据在生成后立即准备好，之后预览时直接返回
+        preview = await loop.run_in_executor(_excel_executor, _load_preview, io.BytesIO(excel_bytes))
+        excel_path = os.path.join(output_dir.name, f"{task.id}.xlsx")
+        await asyncio.to_thread(_write_file, excel_path, excel_bytes)
         timing['excel_generation'] = time.time() - t0
         print(f"[PERF] Excel generation: {timing['excel_generation']:.2f}s")
         
-        task.excel_path = excel_temp.name
+        if _is_cancelled(item):
+            # 生成期间任务被删除，删除刚生成的文件
+            os.unlink(excel_path)
+            return
+        
+        _update_task(task, excel_path=excel_path)
         
         timing['total'] = time.time() - total_start
         print(f"[PERF] Total: {timing['total']:.2f}s")
         print(f"[PERF] Distribution: Text {timing['text_extraction']/timing['total']*100:.1f}% | AI {timing['ai_parsing']/timing['total']*100:.1f}% | Excel {timing['excel_generation']/timing['total']*100:.1f}%")
         
-        task.progress = 100
-        task.status = 'completed'
-        task.message = f"处理完成 (耗时{timing['total']:.1f}s)"
-        
-        # 后台异步上传解析结果到云端
-        license_code = get_local_license()
-        if license_code and result:
-            log_resume_result(
-                license_code=license_code,
-                filename=task.filename,
-                result_json=result,
-                status="success"
-            )
+        item['preview'] = preview
+        _cache_result(item['file_hash'], result, excel_bytes, preview)
+        _finish_task(task, result, f"处理完成 (耗时{timing['total']:.1f}s)")
         
     except Exception as e:
-        task.status = 'error'
-        task.message = str(e)
+        _update_task(task, status='error', message=str(e))
         
         # 记录错误日志
         license_code = get_local_license()
@@ -311,21 +797,26 @@ def process_single_task(item, remaining_quota=None):
 @app.route('/api/tasks/<task_id>/status', methods=['GET'])
 def get_task_status(task_id):
     """获取任务状态"""
-    if task_id not in tasks:
-        return jsonify({'error': '任务不存在'}), 404
+    # 其他线程可能同时淘汰或删除任务，查找需持有锁
+    with _tasks_lock:
+        item = tasks.get(task_id)
+    if item is None:
+        return _json_response({'error': '任务不存在'}, 404)
     
-    return jsonify(tasks[task_id]['task'].to_dict())
+    return Response(_task_json(item['task']), mimetype='application/json')
 
 
 @app.route('/api/tasks/<task_id>/download', methods=['GET'])
 def download_excel(task_id):
     """下载 Excel 文件"""
-    if task_id not in tasks:
-        return jsonify({'error': '任务不存在'}), 404
+    with _tasks_lock:
+        item = tasks.get(task_id)
+    if item is None:
+        return _json_response({'error': '任务不存在'}, 404)
     
-    task = tasks[task_id]['task']
+    task = item['task']
     if not task.excel_path or not os.path.exists(task.excel_path):
-        return jsonify({'error': '文件不存在'}), 404
+        return _json_response({'error': '文件不存在'}, 404)
     
     # 获取姓名作为文件名
     name = "简历"
@@ -335,101 +826,114 @@ def download_excel(task_id):
     return send_file(
         task.excel_path,
         as_attachment=True,
-        download_name=f"{name}_简历.xlsx"
+        download_name=f"{name}_简历.xlsx",
+        conditional=True,
+        max_age=0
     )
 
 
 @app.route('/api/download-all', methods=['GET'])
 def download_all():
     """批量下载所有完成的任务"""
-    completed = [t for t in tasks.values() 
-                 if t['task'].status == 'completed' and t['task'].excel_path]
+    with _tasks_lock:
+        completed = [t for t in tasks.values()
+                     if t['task'].status == 'completed' and t['task'].excel_path]
     
     if not completed:
-        return jsonify({'error': '没有可下载的文件'}), 400
+        return _json_response({'error': '没有可下载的文件'}, 400)
     
-    # 创建 ZIP
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        for item in completed:
-            task = item['task']
-            if os.path.exists(task.excel_path):
-                name = "简历"
-                if task.result:
-                    name = task.result.get("基本信息", {}).get("姓名", Path(task.filename).stem)
-                zf.write(task.excel_path, f"{name}_简历.xlsx")
+    entries = []
+    for item in completed:
+        task = item['task']
+        name = "简历"
+        if task.result:
+            name = task.result.get("基本信息", {}).get("姓名", Path(task.filename).stem)
+        entries.append((task.excel_path, f"{name}_简历.xlsx"))
     
-    zip_buffer.seek(0)
+    # 边打包边发送，不在内存中拼出整个 ZIP；
+    # xlsx 本身就是压缩过的 zip，再压缩几乎不减小体积，直接存储
+    def generate():
+        stream = _ZipStreamBuffer()
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as zf:
+            for excel_path, arcname in entries:
+                try:
+                    zf.write(excel_path, arcname)
+                except OSError:
+                    continue  # 打包期间任务被删除
+                yield stream.drain()
+        yield stream.drain()
     
-    return send_file(
-        zip_buffer,
+    download_name = f"简历批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(
+        generate(),
         mimetype='application/zip',
-        as_attachment=True,
-        download_name=f"简历批量导出_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        headers={
+            'Content-Disposition': f"attachment; filename=resumes.zip; filename*=UTF-8''{quote(download_name)}"
+        }
     )
 
 
+class _ZipStreamBuffer(io.RawIOBase):
+    """只追加的输出缓冲区，供 zipfile 以流式（不可 seek）方式写入"""
+    
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        """取出目前已写入的内容"""
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
 @app.route('/api/tasks/<task_id>/result', methods=['GET'])
 def get_result(task_id):
     """获取解析结果 JSON"""
-    if task_id not in tasks:
-        return jsonify({'error': '任务不存在'}), 404
+    with _tasks_lock:
+        item = tasks.get(task_id)
+    if item is None:
+        return _json_response({'error': '任务不存在'}, 404)
     
-    task = tasks[task_id]['task']
+    task = item['task']
     if not task.result:
-        return jsonify({'error': '暂无结果'}), 404
+        return _json_response({'error': '暂无结果'}, 404)
     
-    return jsonify(task.result)
+    # 解析结果生成后不再变化，只序列化一次
+    data = item.get('result_json')
+    if data is None:
+        data = item['result_json'] = _json_bytes(task.result)
+    return Response(data, mimetype='application/json')
 
 
 @app.route('/api/tasks/<task_id>/excel-preview', methods=['GET'])
 def get_excel_preview(task_id):
-    """获取 Excel 预览数据"""
-    from openpyxl import load_workbook
-    
-    if task_id not in tasks:
-        return jsonify({'error': '任务不存在'}), 404
+    """获取 Excel 预览数据（生成 Excel 时已预先生成）"""
+    with _tasks_lock:
+        item = tasks.get(task_id)
+    if item is None:
+        return _json_response({'error': '任务不存在'}, 404)
     
-    task = tasks[task_id]['task']
+    task = item['task']
     if not task.excel_path or not os.path.exists(task.excel_path):
-        return jsonify({'error': '文件不存在'}), 404
+        return _json_response({'error': '文件不存在'}, 404)
     
-    try:
-        wb = load_workbook(task.excel_path)
-        ws = wb.active
-        
-        # 读取所有数据
-        rows = []
-        for row in ws.iter_rows(min_row=1, max_row=min(ws.max_row, 100)):  # 最多100行
-            row_data = []
-            for cell in row:
-                value = cell.value
-                if value is None:
-                    value = ''
-                elif hasattr(value, 'strftime'):  # 日期类型
-                    value = value.strftime('%Y-%m-%d')
-                else:
-                    value = str(value)
-                row_data.append(value)
-            rows.append(row_data)
-        
-        # 获取合并单元格信息
-        merged_cells = []
-        for merged_range in ws.merged_cells.ranges:
-            merged_cells.append({
-                'startRow': merged_range.min_row - 1,
-                'endRow': merged_range.max_row - 1,
-                'startCol': merged_range.min_col - 1,
-                'endCol': merged_range.max_col - 1
-            })
-        
-        return jsonify({
-            'rows': rows,
-            'mergedCells': merged_cells,
-            'maxCol': ws.max_column
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    preview = item.get('preview')
+    if preview is None:
+        try:
+            preview = _load_preview(task.excel_path)
+        except Exception as e:
+            return _json_response({'error': str(e)}, 500)
+        item['preview'] = preview
+    
+    return Response(preview, mimetype='application/json')
 
 
 # ============================================================
@@ -440,7 +944,7 @@ def get_excel_preview(task_id):
 def get_license_status():
     """获取当前授权状态"""
     result = check_startup_license()
-    return jsonify(result)
+    return _json_response(result)
 
 
 @app.route('/api/license/validate', methods=['POST'])
@@ -455,7 +959,7 @@ def validate_license_api():
     if result.get('valid'):
         save_local_license(code)
     
-    return jsonify(result)
+    return _json_response(result)
 
 
 # ============================================================
@@ -463,9 +967,24 @@ def validate_license_api():
 # ============================================================
 
 def run_flask():
-    """运行 Flask 服务"""
+    """运行 Flask 服务（优先使用 waitress，未安装时退回 Flask 开发服务器）"""
     try:
-        app.run(host='127.0.0.1', port=DEFAULT_PORT, debug=False, threaded=True)
+        try:
+            from waitress import serve
+        except ImportError:
+            app.run(host='127.0.0.1', port=DEFAULT_PORT, debug=False, threaded=True)
+        else:
+            # 长轮询请求会占用一个线程最多 LONG_POLL_TIMEOUT 秒，
+            # 线程数留足余量，避免上传、下载、预览排在长轮询后面
+            serve(
+                app,
+                host='127.0.0.1',
+                port=DEFAULT_PORT,
+                threads=16,
+                connection_limit=100,
+                channel_timeout=LONG_POLL_TIMEOUT * 4,
+                _quiet=True
+            )
     except Exception as e:
         print(f"Flask startup failed: {e}")
 
@@ -497,6 +1016,9 @@ def run_webview():
     flask_thread = threading.Thread(target=run_flask, daemon=True)
     flask_thread.start()
     
+    # Preload parser dependencies while the window starts
+    threading.Thread(target=warm_up, daemon=True).start()
+    
     # Wait for Flask to start (max 30 seconds)
     print(f"Waiting for server at http://127.0.0.1:{DEFAULT_PORT} ...")
     if not wait_for_server(DEFAULT_PORT, timeout=30):
@@ -537,10 +1059,16 @@ def run_browser():
     if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
         threading.Timer(1.5, lambda: webbrowser.open(f'http://127.0.0.1:{DEFAULT_PORT}')).start()
     
+    # 后台预加载解析依赖
+    threading.Thread(target=warm_up, daemon=True).start()
+    
     app.run(host='127.0.0.1', port=DEFAULT_PORT, debug=True)
 
 
 if __name__ == '__main__':
+    # 打包后的程序启动 Excel 生成子进程时需要
+    multiprocessing.freeze_support()
+    
     import argparse
     parser = argparse.ArgumentParser()
     parser.add_argument('--mode', choices=['browser', 'desktop'], default='desktop',
@@ -0,0 +1,90 @@
+-- ============================================================
+-- 批量扣减配额的服务端函数
+-- 一次 RPC 调用内完成：验证授权码 -> 扣减配额 -> 记录使用日志，
+-- 客户端只需一次网络往返，且扣减在行锁内完成，多台设备同时使用同一授权码时不会超扣
+-- 
+-- 在 Supabase SQL Editor 中执行此脚本
+-- 未部署此函数时，客户端自动退回原来的 查询 + 更新 + 记录日志 三步流程
+-- ============================================================
+
+CREATE OR REPLACE FUNCTION consume_quota_batch(
+    p_code TEXT,
+    p_amount INT,
+    p_app_version TEXT DEFAULT NULL,
+    p_client_info JSONB DEFAULT NULL
+)
+RETURNS JSONB
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    v_license licenses%ROWTYPE;
+    v_remaining INT;
+BEGIN
+    -- 函数以 SECURITY DEFINER 执行且对 anon 开放，必须拒绝非正数的扣减量，
+    -- 否则传入负数即可减少 used_quota、绕过 RLS 恢复配额
+    IF p_amount IS NULL OR p_amount <= 0 THEN
+        RETURN jsonb_build_object('success', FALSE, 'message', '无效的扣减数量');
+    END IF;
+
+    -- 锁定授权码所在行，保证并发扣减的正确性
+    SELECT * INTO v_license
+    FROM licenses
+    WHERE code = p_code AND is_active = TRUE
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('success', FALSE, 'message', '无效的授权码');
+    END IF;
+
+    IF v_license.expires_at IS NOT NULL AND v_license.expires_at < now() THEN
+        RETURN jsonb_build_object('success', FALSE, 'message', '授权码已过期');
+    END IF;
+
+    -- 无限配额不需要扣减
+    IF v_license.is_unlimited THEN
+        RETURN jsonb_build_object(
+            'success', TRUE,
+            'message', '无限配额，无需扣减',
+            'remaining', '∞ 无限',
+            'remaining_quota', '∞ 无限'
+        );
+    END IF;
+
+    IF v_license.used_quota >= v_license.total_quota THEN
+        RETURN jsonb_build_object(
+            'success', FALSE,
+            'message', format('配额已用完 (%s/%s)', v_license.used_quota, v_license.total_quota)
+        );
+    END IF;
+
+    v_remaining := v_license.total_quota - v_license.used_quota - p_amount;
+    IF v_remaining < 0 THEN
+        RETURN jsonb_build_object(
+            'success', FALSE,
+            'message', '配额不足',
+            'remaining', 0,
+            'remaining_quota', '0 次'
+        );
+    END IF;
+
+    UPDATE licenses
+    SET used_quota = used_quota + p_amount,
+        last_used_at = now()
+    WHERE id = v_license.id;
+
+    INSERT INTO usage_logs (license_id, action, app_version, client_info)
+    VALUES (v_license.id, 'consume', p_app_version, p_client_info);
+
+    RETURN jsonb_build_object(
+        'success', TRUE,
+        'message', format('已使用 %s 次配额', p_amount),
+        'remaining', v_remaining,
+        'remaining_quota', v_remaining || ' 次'
+    );
+END;
+$$;
+
+-- 允许客户端（anon key）调用
+GRANT EXECUTE ON FUNCTION consume_quota_batch(TEXT, INT, TEXT, JSONB) TO anon;
@@ -19,6 +19,9 @@ import os
 import json
 import requests
 import threading
+import queue
+import time
+import atexit
 import platform
 import socket
 from datetime import datetime
@@ -35,6 +38,13 @@ SUPABASE_ANON_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBhYmFzZS
 CONFIG_DIR = Path.home() / ".cyber_resume_parser"
 LICENSE_FILE = CONFIG_DIR / "license.json"
 
+# 解析结果日志批量上传：每批最多条数，以及凑批的最长等待秒数
+LOG_BATCH_SIZE = 50
+LOG_BATCH_WAIT = 2.0
+
+# 授权码记录的本地缓存有效期（秒）
+LICENSE_CACHE_TTL = 60
+
 
 class LicenseManager:
     """授权码管理器"""
@@ -48,6 +58,19 @@ class LicenseManager:
             "Content-Type": "application/json",
             "Prefer": "return=representation"
         }
+        # 复用 HTTPS 连接（keep-alive），避免每次请求都重新进行 TCP + TLS 握手；
+        # 后台日志线程会并发请求，连接池留足余量
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=16)
+        self.session.mount("https://", adapter)
+        self._quota_rpc_available = True  # 服务端是否部署了 consume_quota_batch 函数
+        self._license_cache = {}  # 授权码 -> (缓存时间, 授权码记录)
+        self._local_license = None  # (本地授权文件修改时间, 授权码)
+        self._license_ids = {}  # 授权码 -> license_id，只在首次上传日志时查询一次
+        self._log_queue = queue.Queue()
+        self._log_worker = None
+        self._log_worker_lock = threading.Lock()
         self._ensure_config_dir()
     
     def _ensure_config_dir(self):
@@ -61,11 +84,11 @@ class LicenseManager:
         for attempt in range(retries):
             try:
                 if method == "GET":
-                    response = requests.get(url, headers=self.headers, timeout=30)
+                    response = self.session.get(url, timeout=30)
                 elif method == "PATCH":
-                    response = requests.patch(url, headers=self.headers, json=data, timeout=30)
+                    response = self.session.patch(url, json=data, timeout=30)
                 elif method == "POST":
-                    response = requests.post(url, headers=self.headers, json=data, timeout=30)
+                    response = self.session.post(url, json=data, timeout=30)
                 else:
                     return {"error": f"Unsupported method: {method}"}
                 
@@ -80,7 +103,6 @@ class LicenseManager:
                     return {"error": f"HTTP {response.status_code}: {response.text}"}
             except requests.exceptions.ConnectionError:
                 if attempt < retries - 1:
-                    import time
                     time.sleep(1)  # 等待1秒后重试
                     continue
                 return {"error": "无法连接到服务器，请检查网络连接"}
@@ -91,9 +113,10 @@ class LicenseManager:
             except Exception as e:
                 return {"error": str(e)}
     
-    def validate_license(self, license_code: str) -> dict:
+    def validate_license(self, license_code: str, fresh: bool = False) -> dict:
         """
         验证授权码
+        fresh 为 True 时忽略本地缓存，重新从服务端查询（扣减配额前必须使用最新记录）
         返回: {
             "valid": bool,
             "message": str,
@@ -105,18 +128,23 @@ class LicenseManager:
         
         license_code = license_code.strip().upper()
         
-        # 查询授权码
-        endpoint = f"licenses?code=eq.{license_code}&is_active=eq.true&select=*"
-        result = self._supabase_request("GET", endpoint)
-        
-        if "error" in result:
-            return {"valid": False, "message": result["error"]}
-        
-        licenses = result.get("data", [])
-        if not licenses:
-            return {"valid": False, "message": "无效的授权码"}
-        
-        license_info = licenses[0]
+        # 查询授权码（仅用于展示和校验时短时间内复用本地缓存；
+        # 其他设备可能同时使用同一授权码，缓存中的已用配额可能已过时）
+        cached_at, license_info = self._license_cache.get(license_code, (0, None))
+        if fresh or license_info is None or time.time() - cached_at >= LICENSE_CACHE_TTL:
+            endpoint = f"licenses?code=eq.{license_code}&is_active=eq.true&select=*"
+            result = self._supabase_request("GET", endpoint)
+            
+            if "error" in result:
+                return {"valid": False, "message": result["error"]}
+            
+            licenses = result.get("data", [])
+            if not licenses:
+                self._license_cache.pop(license_code, None)
+                return {"valid": False, "message": "无效的授权码"}
+            
+            license_info = licenses[0]
+            self._license_cache[license_code] = (time.time(), license_info)
         
         # 检查是否过期
         if license_info.get("expires_at"):
@@ -159,8 +187,40 @@ class LicenseManager:
         """
         license_code = license_code.strip().upper()
         
-        # 先验证授权码
-        validation = self.validate_license(license_code)
+        # 优先调用服务端函数（见 docs/consume_quota_batch.sql），一次请求完成验证、扣减和记录日志
+        # 该函数不是幂等的：请求已到达服务端但响应丢失时重试会重复扣减，因此只发送一次
+        if self._quota_rpc_available:
+            result = self._supabase_request("POST", "rpc/consume_quota_batch", {
+                "p_code": license_code,
+                "p_amount": amount,
+                "p_app_version": APP_VERSION,
+                "p_client_info": self._get_client_info()
+            }, retries=1)
+            if "error" not in result:
+                self._update_cached_usage(license_code, result["data"])
+                return result["data"]
+            if not result["error"].startswith("HTTP 404"):
+                return {"success": False, "message": result["error"]}
+            # 服务端尚未部署该函数，之后直接使用原流程
+            self._quota_rpc_available = False
+        
+        return self._consume_quota_legacy(license_code, amount)
+    
+    def _update_cached_usage(self, license_code: str, result: dict):
+        """根据服务端扣减结果同步本地缓存中的已用配额"""
+        _, cached = self._license_cache.get(license_code, (0, None))
+        if cached is None or cached.get("is_unlimited"):
+            return
+        if result.get("success") and isinstance(result.get("remaining"), int):
+            cached["used_quota"] = cached.get("total_quota", 0) - result["remaining"]
+        else:
+            # 扣减失败说明本地记录可能已过时
+            self._license_cache.pop(license_code, None)
+    
+    def _consume_quota_legacy(self, license_code: str, amount: int) -> dict:
+        """消耗配额（原流程：验证 -> 更新 -> 后台记录日志，共三次请求）"""
+        # 先验证授权码：写回的是绝对值，必须基于服务端最新的 used_quota 计算，不能使用缓存
+        validation = self.validate_license(license_code, fresh=True)
         if not validation["valid"]:
             return {"success": False, "message": validation["message"]}
         
@@ -198,6 +258,11 @@ class LicenseManager:
         if "error" in result:
             return {"success": False, "message": result["error"]}
         
+        # 同步本地缓存中的已用配额（供界面展示；下次扣减仍会重新查询）
+        _, cached = self._license_cache.get(license_code, (0, None))
+        if cached is not None:
+            cached["used_quota"] = new_used
+        
         # 记录使用日志
         self._log_usage(license_code, amount)
         
@@ -255,7 +320,7 @@ class LicenseManager:
         error_message: str = None
     ):
         """
-        后台异步上传解析结果到云端
+        后台异步上传解析结果到云端（进入队列，由后台线程批量上传）
         
         参数:
             license_code: 授权码
@@ -264,54 +329,105 @@ class LicenseManager:
             status: 状态 (success/error)
             error_message: 错误信息
         """
-        def _async_upload():
-            try:
-                # 获取 license_id
-                endpoint = f"licenses?code=eq.{license_code}&select=id,owner_name"
-                result = self._supabase_request("GET", endpoint)
-                if "error" in result or not result.get("data"):
-                    return
-                
-                license_id = result["data"][0]["id"]
-                owner_name = result["data"][0].get("owner_name", "Unknown")
-                
-                # 从解析结果中提取候选人信息
-                basic_info = result_json.get("基本信息", {}) or result_json.get("basic_info", {})
-                personal_info = result_json.get("个人信息", {}) or result_json.get("personal_info", {})
-                
-                candidate_name = basic_info.get("姓名") or basic_info.get("name") or "未知"
-                candidate_phone = personal_info.get("电话") or personal_info.get("phone") or ""
-                candidate_email = personal_info.get("邮箱") or personal_info.get("email") or ""
-                
-                # 构建日志数据
-                log_data = {
-                    "license_id": license_id,
-                    "action": "parse_resume",
-                    "filename": filename[:255],  # 限制长度
-                    "candidate_name": candidate_name[:100],
-                    "candidate_phone": candidate_phone[:50],
-                    "candidate_email": candidate_email[:100],
-                    "result_json": result_json,  # 直接传字典，Supabase 会转为 JSONB
-                    "status": status,
-                    "error_message": error_message[:500] if error_message else None,
-                    "app_version": APP_VERSION,
-                    "client_info": self._get_client_info()
-                }
-                
-                # 上传到 Supabase
-                upload_result = self._supabase_request("POST", "usage_logs", log_data)
-                
-                if "error" not in upload_result:
-                    print(f"📤 [后台] 已上传解析结果: {candidate_name}")
-                else:
-                    print(f"⚠️ [后台] 上传失败: {upload_result.get('error')}")
-                    
-            except Exception as e:
-                print(f"⚠️ [后台] 上传异常: {e}")
+        # 从解析结果中提取候选人信息
+        basic_info = result_json.get("基本信息", {}) or result_json.get("basic_info", {})
+        personal_info = result_json.get("个人信息", {}) or result_json.get("personal_info", {})
         
-        # 后台线程异步执行，不阻塞主流程
-        thread = threading.Thread(target=_async_upload, daemon=True)
-        thread.start()
+        candidate_name = basic_info.get("姓名") or basic_info.get("name") or "未知"
+        candidate_phone = personal_info.get("电话") or personal_info.get("phone") or ""
+        candidate_email = personal_info.get("邮箱") or personal_info.get("email") or ""
+        
+        # 构建日志数据（license_id 由后台线程补齐）
+        log_data = {
+            "action": "parse_resume",
+            "filename": filename[:255],  # 限制长度
+            "candidate_name": candidate_name[:100],
+            "candidate_phone": candidate_phone[:50],
+            "candidate_email": candidate_email[:100],
+            "result_json": result_json,  # 直接传字典，Supabase 会转为 JSONB
+            "status": status,
+            "error_message": error_message[:500] if error_message else None,
+            "app_version": APP_VERSION,
+            "client_info": self._get_client_info()
+        }
+        
+        # 放入队列由后台线程批量上传，不阻塞主流程
+        self._ensure_log_worker()
+        self._log_queue.put((license_code, log_data))
+    
+    def _ensure_log_worker(self):
+        """首次使用时启动日志上传线程"""
+        with self._log_worker_lock:
+            if self._log_worker is None:
+                self._log_worker = threading.Thread(target=self._log_worker_loop, daemon=True)
+                self._log_worker.start()
+                atexit.register(self._flush_logs)
+    
+    def _log_worker_loop(self):
+        """后台线程：攒够 LOG_BATCH_SIZE 条或等待 LOG_BATCH_WAIT 秒后一次性上传"""
+        while True:
+            item = self._log_queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + LOG_BATCH_WAIT
+            while len(batch) < LOG_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._log_queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            self._upload_logs(batch)
+            if stop:
+                return
+    
+    def _flush_logs(self):
+        """程序退出前上传队列中剩余的日志"""
+        if self._log_worker is not None and self._log_worker.is_alive():
+            self._log_queue.put(None)
+            self._log_worker.join(timeout=10)
+    
+    def _get_license_id(self, license_code: str):
+        """获取授权码对应的 license_id（带缓存）"""
+        license_id = self._license_ids.get(license_code)
+        if license_id is None:
+            endpoint = f"licenses?code=eq.{license_code}&select=id"
+            result = self._supabase_request("GET", endpoint)
+            if "error" in result or not result.get("data"):
+                return None
+            license_id = result["data"][0]["id"]
+            self._license_ids[license_code] = license_id
+        return license_id
+    
+    def _upload_logs(self, batch: list):
+        """批量上传一批解析结果日志（PostgREST 支持数组一次插入多行）"""
+        try:
+            rows = []
+            for license_code, log_data in batch:
+                license_id = self._get_license_id(license_code)
+                if license_id is None:
+                    continue
+                rows.append({"license_id": license_id, **log_data})
+            if not rows:
+                return
+            
+            upload_result = self._supabase_request("POST", "usage_logs", rows)
+            
+            if "error" not in upload_result:
+                print(f"📤 [后台] 已上传 {len(rows)} 条解析结果")
+            else:
+                print(f"⚠️ [后台] 上传失败: {upload_result.get('error')}")
+                
+        except Exception as e:
+            print(f"⚠️ [后台] 上传异常: {e}")
     
     def get_license_status(self, license_code: str) -> dict:
         """获取授权码状态"""
@@ -334,12 +450,17 @@ class LicenseManager:
             return False
     
     def load_license_locally(self) -> str:
-        """从本地加载授权码"""
+        """从本地加载授权码（按文件修改时间缓存，每个任务完成时都会调用，文件未变化时不再重新读取）"""
         try:
             if LICENSE_FILE.exists():
+                mtime = LICENSE_FILE.stat().st_mtime_ns
+                if self._local_license is not None and self._local_license[0] == mtime:
+                    return self._local_license[1]
                 with open(LICENSE_FILE, "r") as f:
                     config = json.load(f)
-                return config.get("license_code", "")
+                license_code = config.get("license_code", "")
+                self._local_license = (mtime, license_code)
+                return license_code
         except Exception as e:
             print(f"加载授权码失败: {e}")
         return ""
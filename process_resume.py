@@ -7,43 +7,58 @@
     单个文件：python process_resume.py Resumes/xxx.pdf
     批量处理：python process_resume.py Resumes/
     指定输出：python process_resume.py Resumes/xxx.pdf -o Output/
+    并发数量：python process_resume.py Resumes/ -j 4
 """
 
 import os
 import sys
+import asyncio
 import argparse
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor
 
 # 导入解析和生成模块
-from resume_parser import extract_text_from_resume, parse_resume_with_llm
+from resume_parser import extract_text_from_resume, parse_resume_with_llm, parse_resume_with_llm_async
 from resume_template_generator import ResumeTemplateGenerator
 import json
 
+try:
+    import orjson  # 可选依赖，读写解析结果 JSON 更快，直接输出 UTF-8
+except ImportError:
+    orjson = None
+
 # 支持的文件格式
 SUPPORTED_FORMATS = ['.pdf', '.docx']
 
+# 批量处理的并发数（同时进行的 AI 解析请求数）
+DEFAULT_CONCURRENCY = min(8, (os.cpu_count() or 1) * 2)
+CPU_WORKERS = min(4, os.cpu_count() or 1)  # 批量处理时提取文本、生成 Excel 的进程数
+
 
-def process_single_resume(file_path: str, output_dir: str = None, template_path: str = None) -> Tuple[bool, str]:
+def _resolve_paths(file_path: str, output_dir: str = None, template_path: str = None) -> Tuple[Path, Path, Path, Path]:
     """
-    处理单个简历文件
+    校验输入文件并计算输出路径
     
     Args:
-        file_path: 简历文件路径（支持 .pdf, .docx）
+        file_path: 简历文件路径
         output_dir: 输出目录（可选，默认与源文件同目录）
         template_path: 模板文件路径（可选）
         
     Returns:
-        (是否成功, 消息)
+        (简历路径, JSON 输出路径, Excel 输出路径, 模板路径)
+        
+    Raises:
+        ValueError: 文件不存在、格式不支持或模板不存在
     """
     file_path = Path(file_path)
     
     if not file_path.exists():
-        return False, f"文件不存在: {file_path}"
+        raise ValueError(f"文件不存在: {file_path}")
     
     suffix = file_path.suffix.lower()
     if suffix not in SUPPORTED_FORMATS:
-        return False, f"不支持的文件格式: {suffix}，支持的格式: {', '.join(SUPPORTED_FORMATS)}"
+        raise ValueError(f"不支持的文件格式: {suffix}，支持的格式: {', '.join(SUPPORTED_FORMATS)}")
     
     # 确定输出目录
     if output_dir:
@@ -62,31 +77,159 @@ def process_single_resume(file_path: str, output_dir: str = None, template_path:
         template_path = Path(__file__).parent / "Templates" / "template.xlsx"
     
     if not Path(template_path).exists():
-        return False, f"模板文件不存在: {template_path}"
+        raise ValueError(f"模板文件不存在: {template_path}")
+    
+    return file_path, json_path, excel_path, Path(template_path)
+
+
+def _save_json(parsed_data: dict, json_path: Path) -> None:
+    """保存解析结果 JSON"""
+    if orjson is not None:
+        json_path.write_bytes(orjson.dumps(parsed_data, option=orjson.OPT_INDENT_2))
+        return
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(parsed_data, f, ensure_ascii=False, indent=2)
+
+
+def _load_existing_json(file_path: Path, json_path: Path) -> Optional[dict]:
+    """
+    读取之前保存的解析结果（JSON 比源文件新时才使用），用于重复运行时跳过文本提取和 AI 解析
     
+    Returns:
+        解析结果；不存在、已过期或无法读取时返回 None
+    """
     try:
-        # ========== 步骤1: 提取文本 ==========
-        print(f"\n  [1/3] 提取文本 ({suffix})...")
-        resume_text = extract_text_from_resume(str(file_path))
-        print(f"        提取完成，共 {len(resume_text)} 字符")
-        
-        # ========== 步骤2: 调用 LLM 解析 ==========
-        print(f"  [2/3] 调用 DeepSeek 解析简历...")
-        parsed_data = parse_resume_with_llm(resume_text)
-        
-        # 检查解析结果
-        if "error" in parsed_data:
-            return False, f"解析失败: {parsed_data['error']}"
+        if json_path.stat().st_mtime < file_path.stat().st_mtime:
+            return None
+        data = json_path.read_bytes()
+        parsed_data = orjson.loads(data) if orjson is not None else json.loads(data)
+    except (OSError, ValueError):
+        return None
+    return parsed_data if isinstance(parsed_data, dict) else None
+
+
+def _generate_excel(template_path: Path, parsed_data: dict, excel_path: Path, verbose: bool = False) -> None:
+    """根据解析结果生成 Excel 模板（批量时在进程池中并发执行，不打印步骤以免输出交错）"""
+    generator = ResumeTemplateGenerator(str(template_path))
+    generator.generate(parsed_data, str(excel_path), verbose=verbose)
+
+
+def process_single_resume(
+    file_path: str,
+    output_dir: str = None,
+    template_path: str = None,
+    force: bool = False
+) -> Tuple[bool, str]:
+    """
+    处理单个简历文件
+    
+    Args:
+        file_path: 简历文件路径（支持 .pdf, .docx）
+        output_dir: 输出目录（可选，默认与源文件同目录）
+        template_path: 模板文件路径（可选）
+        force: 为 True 时即使已有最新的解析结果 JSON 也重新解析
         
-        # 保存 JSON
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(parsed_data, f, ensure_ascii=False, indent=2)
-        print(f"        解析完成，已保存: {json_path}")
+    Returns:
+        (是否成功, 消息)
+    """
+    try:
+        file_path, json_path, excel_path, template_path = _resolve_paths(file_path, output_dir, template_path)
+    except ValueError as e:
+        return False, str(e)
+    
+    suffix = file_path.suffix.lower()
+    
+    try:
+        # 已有比源文件新的解析结果时直接生成 Excel（如只修改了模板）
+        parsed_data = None if force else _load_existing_json(file_path, json_path)
+        if parsed_data is not None:
+            print(f"\n  [1-2/3] 使用已有解析结果: {json_path}")
+        else:
+            # ========== 步骤1: 提取文本 ==========
+            print(f"\n  [1/3] 提取文本 ({suffix})...")
+            resume_text = extract_text_from_resume(str(file_path))
+            print(f"        提取完成，共 {len(resume_text)} 字符")
+            
+            # ========== 步骤2: 调用 LLM 解析 ==========
+            print(f"  [2/3] 调用 DeepSeek 解析简历...")
+            parsed_data = parse_resume_with_llm(resume_text)
+            
+            # 检查解析结果
+            if "error" in parsed_data:
+                return False, f"解析失败: {parsed_data['error']}"
+            
+            # 保存 JSON
+            _save_json(parsed_data, json_path)
+            print(f"        解析完成，已保存: {json_path}")
         
         # ========== 步骤3: 生成 Excel 模板 ==========
         print(f"  [3/3] 生成 Excel 模板...")
-        generator = ResumeTemplateGenerator(str(template_path))
-        generator.generate(parsed_data, str(excel_path))
+        _generate_excel(template_path, parsed_data, excel_path, verbose=True)
+        
+        return True, f"处理完成！\n        JSON: {json_path}\n        Excel: {excel_path}"
+        
+    except Exception as e:
+        return False, f"处理出错: {str(e)}"
+
+
+async def process_single_resume_async(
+    file_path: str,
+    output_dir: str = None,
+    template_path: str = None,
+    semaphore: asyncio.Semaphore = None,
+    cpu_executor: Executor = None,
+    force: bool = False
+) -> Tuple[bool, str]:
+    """
+    异步处理单个简历文件（批量处理时使用）
+    
+    文本提取和 Excel 生成在 cpu_executor 中执行，LLM 调用直接在事件循环中异步进行，
+    多份简历并发时，一份简历的文本提取 / Excel 生成可以与另一份简历的 LLM 调用重叠。
+    信号量只限制同时进行的 LLM 调用，排队等待 LLM 时其他简历的文本提取照常进行。
+    
+    Args:
+        file_path: 简历文件路径（支持 .pdf, .docx）
+        output_dir: 输出目录（可选，默认与源文件同目录）
+        template_path: 模板文件路径（可选）
+        semaphore: 限制同时进行的 LLM 调用数量（可选）
+        cpu_executor: 执行文本提取和 Excel 生成的进程池（可选，默认在线程中执行）
+        force: 为 True 时即使已有最新的解析结果 JSON 也重新解析
+        
+    Returns:
+        (是否成功, 消息)
+    """
+    try:
+        file_path, json_path, excel_path, template_path = _resolve_paths(file_path, output_dir, template_path)
+    except ValueError as e:
+        return False, str(e)
+    
+    name = file_path.name
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(1)
+    
+    try:
+        parsed_data = None if force else await asyncio.to_thread(_load_existing_json, file_path, json_path)
+        if parsed_data is not None:
+            print(f"  [{name}] 使用已有解析结果")
+        else:
+            print(f"  [{name}] 提取文本...")
+            resume_text = await asyncio.get_running_loop().run_in_executor(
+                cpu_executor, extract_text_from_resume, str(file_path)
+            )
+            
+            async with semaphore:
+                print(f"  [{name}] 调用 DeepSeek 解析 ({len(resume_text)} 字符)...")
+                parsed_data = await parse_resume_with_llm_async(resume_text)
+            
+            if "error" in parsed_data:
+                return False, f"解析失败: {parsed_data['error']}"
+            
+            await asyncio.to_thread(_save_json, parsed_data, json_path)
+        
+        print(f"  [{name}] 生成 Excel 模板...")
+        await asyncio.get_running_loop().run_in_executor(
+            cpu_executor, _generate_excel, template_path, parsed_data, excel_path
+        )
         
         return True, f"处理完成！\n        JSON: {json_path}\n        Excel: {excel_path}"
         
@@ -94,7 +237,45 @@ def process_single_resume(file_path: str, output_dir: str = None, template_path:
         return False, f"处理出错: {str(e)}"
 
 
-def process_directory(dir_path: str, output_dir: str = None, template_path: str = None) -> None:
+async def _process_files_async(
+    resume_files: List[Path],
+    output_dir: str = None,
+    template_path: str = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    force: bool = False
+) -> List[Tuple[bool, str]]:
+    """
+    并发处理多个简历文件，返回结果顺序与输入一致
+    
+    文本提取（PyMuPDF 解析期间持有 GIL）和 Excel 生成（纯 Python 的 openpyxl）放在共享的进程池中，
+    多份简历的 CPU 工作真正并行；提取完成的简历随即进入异步 LLM 阶段，
+    一份简历生成 Excel 时其他简历的 LLM 调用照常进行
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(resume_files)
+    done_count = 0
+    
+    with ProcessPoolExecutor(max_workers=CPU_WORKERS) as cpu_executor:
+        async def _one(resume_file: Path) -> Tuple[bool, str]:
+            nonlocal done_count
+            success, message = await process_single_resume_async(
+                str(resume_file), output_dir, template_path, semaphore, cpu_executor, force
+            )
+            done_count += 1
+            mark = "✅" if success else "❌"
+            print(f"\n[{done_count}/{total}] {mark} {resume_file.name}: {message}")
+            return success, message
+        
+        return await asyncio.gather(*(_one(f) for f in resume_files))
+
+
+def process_directory(
+    dir_path: str,
+    output_dir: str = None,
+    template_path: str = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    force: bool = False
+) -> None:
     """
     批量处理目录下的所有简历文件（PDF 和 Word）
     
@@ -102,6 +283,8 @@ def process_directory(dir_path: str, output_dir: str = None, template_path: str
         dir_path: 目录路径
         output_dir: 输出目录（可选）
         template_path: 模板文件路径（可选）
+        concurrency: 同时进行的 LLM 调用数量
+        force: 为 True 时忽略已有的解析结果 JSON，全部重新解析
     """
     dir_path = Path(dir_path)
     
@@ -109,41 +292,34 @@ def process_directory(dir_path: str, output_dir: str = None, template_path: str
         print(f"❌ 不是有效目录: {dir_path}")
         return
     
-    # 查找所有支持的文件
-    resume_files = []
-    for fmt in SUPPORTED_FORMATS:
-        resume_files.extend(dir_path.glob(f"*{fmt}"))
+    # 查找所有支持的文件（一次遍历目录，后缀不区分大小写，跳过隐藏文件和 Word 打开时的 ~$ 临时文件）
+    suffixes = frozenset(SUPPORTED_FORMATS)
+    with os.scandir(dir_path) as entries:
+        resume_files = sorted(
+            Path(entry.path) for entry in entries
+            if not entry.name.startswith(('.', '~$'))
+            and entry.is_file()
+            and os.path.splitext(entry.name)[1].lower() in suffixes
+        )
     
     if not resume_files:
         print(f"⚠️  目录中没有简历文件: {dir_path}")
         print(f"   支持的格式: {', '.join(SUPPORTED_FORMATS)}")
         return
     
-    print(f"\n找到 {len(resume_files)} 个简历文件")
+    print(f"\n找到 {len(resume_files)} 个简历文件（并发数: {concurrency}）")
     print("=" * 60)
     
-    success_count = 0
-    fail_count = 0
-    results = []
+    outcomes = asyncio.run(
+        _process_files_async(resume_files, output_dir, template_path, concurrency, force)
+    )
     
-    for i, resume_file in enumerate(resume_files, 1):
-        print(f"\n[{i}/{len(resume_files)}] 处理: {resume_file.name}")
-        print("-" * 40)
-        
-        success, message = process_single_resume(
-            str(resume_file), 
-            output_dir, 
-            template_path
-        )
-        
-        if success:
-            success_count += 1
-            print(f"  ✅ {message}")
-        else:
-            fail_count += 1
-            print(f"  ❌ {message}")
-        
-        results.append((resume_file.name, success, message))
+    results = [
+        (resume_file.name, success, message)
+        for resume_file, (success, message) in zip(resume_files, outcomes)
+    ]
+    success_count = sum(1 for _, success, _ in results if success)
+    fail_count = len(results) - success_count
     
     # 打印汇总
     print("\n" + "=" * 60)
@@ -180,6 +356,12 @@ def main():
     
   指定模板文件:
     python process_resume.py Resumes/张三.pdf -t Templates/custom.xlsx
+    
+  指定批量处理并发数:
+    python process_resume.py Resumes/ -j 4
+    
+  忽略已有的解析结果，全部重新解析:
+    python process_resume.py Resumes/ --force
 
 支持的文件格式: .pdf, .docx
 """
@@ -202,6 +384,19 @@ def main():
         default=None
     )
     
+    parser.add_argument(
+        "-j", "--jobs",
+        help=f"批量处理时同时进行的 AI 解析请求数（默认 {DEFAULT_CONCURRENCY}）",
+        type=int,
+        default=DEFAULT_CONCURRENCY
+    )
+    
+    parser.add_argument(
+        "-f", "--force",
+        help="忽略已有的解析结果 JSON，重新提取文本并调用 AI 解析",
+        action="store_true"
+    )
+    
     args = parser.parse_args()
     
     input_path = Path(args.input)
@@ -221,13 +416,14 @@ def main():
     
     if input_path.is_dir():
         # 批量处理目录
-        process_directory(str(input_path), args.output, args.template)
+        process_directory(str(input_path), args.output, args.template, args.jobs, args.force)
     elif input_path.is_file():
         # 处理单个文件
         success, message = process_single_resume(
             str(input_path), 
             args.output, 
-            args.template
+            args.template,
+            args.force
         )
         if success:
             print(f"\n✅ {message}")
@@ -5,14 +5,31 @@
 支持 PDF 和 Word (.docx) 格式简历，通过 OpenAI 兼容 API 调用 DeepSeek 进行结构化信息提取
 """
 
+import asyncio
+import hashlib
+import io
 import json
 import os
+import random
+import re
+import threading
 import time
+import uuid
+import weakref
+import zipfile
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
+from typing import Callable, List, Optional, Union
 from dotenv import load_dotenv
-import fitz  # PyMuPDF
-from docx import Document  # python-docx
-from openai import OpenAI
+
+try:
+    import orjson  # 可选依赖，JSON 编解码比标准库快数倍
+except ImportError:
+    orjson = None
+
+# fitz (PyMuPDF)、python-docx、openai 导入较慢（openai 约 0.4s），
+# 均在首次使用时再导入，加快桌面应用启动
 
 # 加载环境变量
 env_path = Path(__file__).parent / ".env"
@@ -23,127 +40,284 @@ DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
 DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 AI_MODEL = os.getenv("AI_MODEL", "deepseek-chat")  # 使用原生模型名
 AI_TIMEOUT = int(os.getenv("AI_TIMEOUT", 150))
+MISSING_API_KEY_MESSAGE = "未配置 DEEPSEEK_API_KEY，请在 .env 文件或环境变量中设置"
 
-# 创建 OpenAI 客户端（兼容 DeepSeek API）
-client = OpenAI(
-    api_key=DEEPSEEK_API_KEY,
-    base_url=DEEPSEEK_BASE_URL,
-)
+# 缓存配置（默认放在用户目录，打包后的应用目录不可写）
+CACHE_DIR = Path(os.getenv("CACHE_DIR", Path.home() / ".cyber_resume_parser" / "cache"))
+LLM_CACHE_DIR = CACHE_DIR / "llm"
+TEXT_CACHE_DIR = CACHE_DIR / "text"
+TEXT_CACHE_MAX_MB = float(os.getenv("TEXT_CACHE_MAX_MB", 100))  # 文本提取缓存目录大小上限，0 表示不缓存
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", 100))  # LLM 结果磁盘缓存目录大小上限
+TEXT_EXTRACTOR_VERSION = "3"  # 提取逻辑变化时递增，旧缓存随之失效
+LLM_MEMORY_CACHE_SIZE = 256  # 内存 LRU 最多保留的解析结果数
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", 30))  # 缓存有效期，0 表示永不过期
 
+LLM_MAX_RETRIES = 3
+LLM_MAX_BACKOFF = 60  # 单次重试最长等待秒数
+# 每分钟最多发出的 LLM 请求数，按固定间隔均匀发出；0 表示不限制
+LLM_RPM = int(os.getenv("LLM_RPM", 0))
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """
-    从 PDF 文件中提取文本
+# 页数达到该值的 PDF 按页分段，在多个进程中并行提取文本。
+# 简历通常只有几页，此时进程间传输文件的开销大于并行的收益，仍在当前线程中提取
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", 16))
+PDF_EXTRACT_WORKERS = min(4, os.cpu_count() or 1)
+# 是否在 PDF 每页文本前加 "--- 第 N 页 ---" 标记（仅调试时查看分页用；标记对解析无帮助，只会增加输入 token）
+PDF_PAGE_HEADERS = os.getenv("PDF_PAGE_HEADERS", "0") == "1"
+
+# 简历文本长度限制：过短多为扫描件 / 损坏文件，过长多为解析异常，只发送首尾部分
+MIN_RESUME_TEXT_CHARS = 100
+MIN_RESUME_UNIQUE_CHARS = 20
+MAX_RESUME_TEXT_CHARS = int(os.getenv("MAX_RESUME_TEXT_CHARS", 60000))
+
+
+@lru_cache(maxsize=None)
+def _get_client():
+    """获取 OpenAI 客户端（兼容 DeepSeek API），首次调用时创建，之后复用连接池"""
+    from openai import OpenAI
     
-    Args:
-        pdf_path: PDF 文件路径
+    return OpenAI(
+        api_key=DEEPSEEK_API_KEY,
+        base_url=DEEPSEEK_BASE_URL,
+    )
+
+
+# 异步客户端的连接池绑定在创建它的事件循环上，因此按事件循环分别缓存
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _get_async_client():
+    """获取当前事件循环对应的 AsyncOpenAI 客户端，同一事件循环内复用连接池"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        from openai import AsyncOpenAI
         
-    Returns:
-        提取的文本内容
+        client = AsyncOpenAI(
+            api_key=DEEPSEEK_API_KEY,
+            base_url=DEEPSEEK_BASE_URL,
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def warm_up() -> None:
+    """
+    预加载解析所需的重量级模块和 API 客户端
+    
+    供桌面应用启动后在后台线程调用，避免第一份简历解析时才付出导入开销
     """
-    doc = fitz.open(pdf_path)
-    text_content = []
+    import fitz  # PyMuPDF
+    import docx  # python-docx
     
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text()
-        text_content.append(f"--- 第 {page_num + 1} 页 ---\n{text}")
+    if not DEEPSEEK_API_KEY:
+        print(f"⚠️ {MISSING_API_KEY_MESSAGE}")
+        return
     
-    doc.close()
-    return "\n\n".join(text_content)
+    try:
+        _get_client()
+    except Exception as e:
+        print(f"初始化 AI 客户端失败: {e}")
+
+
+# 请求限速：记录下一个请求最早可以发出的时间（同步、异步调用共用）
+_rate_limit_lock = threading.Lock()
+_next_request_at = 0.0
 
 
-def extract_text_from_docx(docx_path: str) -> str:
+def _reserve_request_slot() -> float:
     """
-    从 Word (.docx) 文件中提取文本
+    预约一个 LLM 请求时间槽（按 LLM_RPM 均匀间隔）
     
-    Args:
-        docx_path: Word 文件路径
-        
     Returns:
-        提取的文本内容
+        距离本次请求可以发出还需等待的秒数
     """
-    doc = Document(docx_path)
-    text_content = []
-    
-    # 提取段落文本
-    for para in doc.paragraphs:
-        if para.text.strip():
-            text_content.append(para.text)
-    
-    # 提取表格文本
-    for table in doc.tables:
-        for row in table.rows:
-            row_text = []
-            for cell in row.cells:
-                if cell.text.strip():
-                    row_text.append(cell.text.strip())
-            if row_text:
-                text_content.append(" | ".join(row_text))
+    global _next_request_at
+    if LLM_RPM <= 0:
+        return 0.0
     
-    return "\n".join(text_content)
+    with _rate_limit_lock:
+        now = time.monotonic()
+        start = max(now, _next_request_at)
+        _next_request_at = start + 60.0 / LLM_RPM
+    return start - now
+
+
+# 内存 LRU：key -> (写入时间, 解析结果 JSON 字节)（存序列化结果而非 dict，避免调用方修改污染缓存）
+_llm_memory_cache = OrderedDict()
+_llm_cache_lock = threading.Lock()
+
+
+def _json_dumps(obj) -> bytes:
+    """序列化为 UTF-8 JSON 字节（优先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: Union[str, bytes]):
+    """解析 JSON（优先使用 orjson，其异常类是 json.JSONDecodeError 的子类）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
 
 
-def extract_text_from_resume(file_path: str) -> str:
+def _llm_cache_key(*parts: str) -> str:
+    """根据模型和完整提示词计算缓存 key，提示词变更后旧缓存自动失效"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _llm_cache_expired(created_at: float) -> bool:
+    """缓存是否已超过有效期"""
+    return LLM_CACHE_TTL_DAYS > 0 and time.time() - created_at > LLM_CACHE_TTL_DAYS * 86400
+
+
+def _remember_llm_result(key: str, result_bytes: bytes, created_at: float) -> None:
+    """写入内存 LRU"""
+    with _llm_cache_lock:
+        _llm_memory_cache[key] = (created_at, result_bytes)
+        _llm_memory_cache.move_to_end(key)
+        while len(_llm_memory_cache) > LLM_MEMORY_CACHE_SIZE:
+            _llm_memory_cache.popitem(last=False)
+
+
+def _llm_cache_get(key: str) -> Optional[dict]:
     """
-    根据文件类型自动选择提取方法
+    查询 LLM 结果缓存（先内存，再磁盘）
     
     Args:
-        file_path: 简历文件路径（支持 .pdf, .docx）
+        key: 缓存 key
         
     Returns:
-        提取的文本内容
-        
-    Raises:
-        ValueError: 不支持的文件格式
+        缓存的解析结果，未命中返回 None
     """
-    file_path = Path(file_path)
-    suffix = file_path.suffix.lower()
+    if not LLM_CACHE_ENABLED:
+        return None
     
-    if suffix == '.pdf':
-        return extract_text_from_pdf(str(file_path))
-    elif suffix == '.docx':
-        return extract_text_from_docx(str(file_path))
-    elif suffix == '.doc':
-        raise ValueError("不支持 .doc 格式，请将文件另存为 .docx 格式")
+    with _llm_cache_lock:
+        entry = _llm_memory_cache.get(key)
+        if entry is not None:
+            _llm_memory_cache.move_to_end(key)
+    
+    if entry is None:
+        cache_path = LLM_CACHE_DIR / f"{key}.json"
+        try:
+            created_at = cache_path.stat().st_mtime
+            result_bytes = cache_path.read_bytes()
+        except OSError:
+            return None
+        _remember_llm_result(key, result_bytes, created_at)
     else:
-        raise ValueError(f"不支持的文件格式: {suffix}，支持的格式: .pdf, .docx")
+        created_at, result_bytes = entry
+    
+    if _llm_cache_expired(created_at):
+        # 过期条目（含简历个人信息）直接删除，不在磁盘上长期保留
+        with _llm_cache_lock:
+            _llm_memory_cache.pop(key, None)
+        try:
+            (LLM_CACHE_DIR / f"{key}.json").unlink()
+        except OSError:
+            pass
+        return None
+    
+    try:
+        return _json_loads(result_bytes)
+    except json.JSONDecodeError:
+        return None
 
 
-def parse_resume_with_llm(resume_text: str) -> dict:
+def _atomic_write_bytes(path: Path, data: bytes) -> None:
     """
-    使用 LLM 解析简历文本，提取结构化信息
+    先写临时文件再原子替换，避免并发读到半截文件
+    
+    临时文件名包含进程号和随机串：线程号在不同进程间会重复，
+    批量处理时多个进程同时写入同一缓存文件也不会互相覆盖临时文件
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            tmp_path.unlink()
+        except OSError:
+            pass
+        raise
+
+
+def _trim_cache_dir(cache_dir: Path, suffix: str, max_mb: float) -> None:
+    """缓存目录超过 max_mb 时按修改时间从旧到新删除文件"""
+    stats = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(suffix):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # 其他进程刚刚删除
+            stats.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in stats)
+    limit = max_mb * 1024 * 1024
+    for _, size, path in sorted(stats):
+        if total <= limit:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def _llm_cache_set(key: str, result: dict) -> None:
+    """保存解析结果到内存和磁盘缓存（磁盘写入失败不影响主流程）"""
+    if not LLM_CACHE_ENABLED:
+        return
+    
+    result_bytes = _json_dumps(result)
+    _remember_llm_result(key, result_bytes, time.time())
+    
+    try:
+        LLM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(LLM_CACHE_DIR / f"{key}.json", result_bytes)
+        _trim_cache_dir(LLM_CACHE_DIR, ".json", LLM_CACHE_MAX_MB)
+    except OSError as e:
+        print(f"写入 LLM 缓存失败: {e}")
+
+
+def get_cached_result_for_file(file_hash: str) -> Optional[dict]:
+    """
+    按简历文件内容的哈希查询解析结果（命中时可跳过文本提取和 LLM 调用）
     
     Args:
-        resume_text: 简历文本内容
+        file_hash: 文件内容的 SHA-256
         
     Returns:
-        解析后的结构化信息
+        缓存的解析结果，未命中返回 None
     """
-    
-    system_prompt = """你是一个专业的简历解析助手。你需要从简历文本中提取结构化信息。
-请严格按照要求的 JSON 格式返回结果，如果某项信息无法从简历中获取，则填写 null。
-日期格式统一为 YYYY-MM-DD。
-注意：
-1. 教育经历按学历从高到低排序（博士 > 硕士 > 本科）
-2. 工作经历和项目经历需要按时间由近及远排序
-3. 仅提取 IT 相关的工作和项目经历
-4. 确保输出是有效的 JSON 格式
-5. 如果某项信息在简历中部分存在，尽可能提取已有信息"""
+    return _llm_cache_get(_llm_cache_key("file", AI_MODEL, SYSTEM_PROMPT, file_hash))
 
-    user_prompt = f"""请解析以下简历文本，提取结构化信息并返回 JSON 格式结果。
 
-简历文本：
-{resume_text}
+def cache_result_for_file(file_hash: str, result: dict) -> None:
+    """按简历文件内容的哈希保存解析结果（与 LLM 结果共用缓存目录，模型或提示词变更后自动失效）"""
+    _llm_cache_set(_llm_cache_key("file", AI_MODEL, SYSTEM_PROMPT, file_hash), result)
 
-请返回以下 JSON 格式的结果（所有字段都必须存在，如果信息不存在则填 null）：
 
-{{
-    "basic_info": {{
+# ============================================================
+# 提示词
+# 静态部分（角色说明 + JSON 格式）全部放在 system 消息中，且为模块级常量，
+# 保证每次请求的前缀字节完全一致，命中 DeepSeek / OpenAI 的自动前缀缓存；
+# 每份简历不同的文本单独放在最后的 user 消息中。
+# ============================================================
+
+RESUME_JSON_SCHEMA = """{
+    "basic_info": {
         "name": "姓名",
         "supplier": "所属供应商"
-    }},
-    "personal_info": {{
+    },
+    "personal_info": {
         "id_card_number": "身份证号",
         "birth_date": "出生日期（YYYY-MM-DD）",
         "phone": "电话",
@@ -151,9 +325,9 @@ def parse_resume_with_llm(resume_text: str) -> dict:
         "first_it_work_date": "首次参加IT领域工作时间（YYYY-MM-DD）",
         "highest_education": "最高学历（本科/硕士/博士）",
         "contract_level": "人员输送当时符合的合同定级"
-    }},
+    },
     "education": [
-        {{
+        {
             "degree_type": "学历类型（本科/硕士/博士）",
             "enrollment_date": "入学时间（YYYY-MM-DD）",
             "university": "毕业院校",
@@ -163,74 +337,612 @@ def parse_resume_with_llm(resume_text: str) -> dict:
             "diploma_verification_code": "毕业证学信网在线验证码",
             "degree_number": "学位证编号",
             "degree_verification_code": "学位证学信网在线验证码"
-        }}
+        }
     ],
     "work_experience": [
-        {{
+        {
             "start_date": "工作开始日期（YYYY-MM-DD）",
             "end_date": "工作结束日期（YYYY-MM-DD，如果是当前工作则填null）",
             "company": "单位名称",
             "position": "岗位/职务",
             "is_psbc_independent_dev": "是否邮储银行自主研发工作经验（true/false）"
-        }}
+        }
     ],
     "project_experience": [
-        {{
+        {
             "start_date": "项目开始日期（YYYY-MM-DD）",
             "end_date": "项目结束日期（YYYY-MM-DD，如果是当前项目则填null）",
             "project_name": "项目名称",
             "description": "项目描述",
             "role": "担任角色/职责",
             "is_psbc_independent_dev": "是否邮储银行自主研发工作经验（true/false）"
-        }}
+        }
     ],
-    "technical_skills": {{
+    "technical_skills": {
         "programming_languages": ["掌握的编程语言列表"],
         "skills": ["掌握的技能列表"],
         "certifications": ["专业证书列表"]
-    }}
-}}
+    }
+}"""
+
+# JSON 结构说明放在系统提示词中，每次请求的前缀完全相同，可以命中 DeepSeek 的
+# 上下文硬盘缓存（自动生效，命中部分按缓存价格计费）；用户消息只包含简历文本。
+# 因此提示词必须保持为固定常量，不要在其中插入日期等每次不同的内容
+SYSTEM_PROMPT = """你是一个专业的简历解析助手。你需要从简历文本中提取结构化信息。
+请严格按照要求的 JSON 格式返回结果，如果某项信息无法从简历中获取，则填写 null。
+日期格式统一为 YYYY-MM-DD。
+注意：
+1. 教育经历按学历从高到低排序（博士 > 硕士 > 本科）
+2. 工作经历和项目经历需要按时间由近及远排序
+3. 仅提取 IT 相关的工作和项目经历
+4. 确保输出是有效的 JSON 格式
+5. 如果某项信息在简历中部分存在，尽可能提取已有信息
+
+请返回以下 JSON 格式的结果（所有字段都必须存在，如果信息不存在则填 null）：
+
+""" + RESUME_JSON_SCHEMA + """
 
 请只返回 JSON，不要包含其他解释性文字。确保 JSON 格式有效。"""
 
-    max_retries = 3
+USER_PROMPT_TEMPLATE = """请解析以下简历文本，提取结构化信息并返回 JSON 格式结果。
+
+简历文本：
+{resume_text}"""
+
+
+def _open_pdf(pdf_source: Union[str, bytes]):
+    """打开 PDF（文件路径或内存中的文件内容）"""
+    import fitz  # PyMuPDF
+    
+    if isinstance(pdf_source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=pdf_source, filetype="pdf")
+    return fitz.open(pdf_source)
+
+
+def _extract_pdf_pages(pdf_source: Union[str, bytes], start: int, stop: int) -> List[str]:
+    """
+    提取 PDF 中 [start, stop) 范围内各页的文本（模块级函数，可提交到进程池执行）
+    
+    Args:
+        pdf_source: PDF 文件路径，或内存中的 PDF 文件内容
+        start: 起始页下标（从 0 开始）
+        stop: 结束页下标（不含）
+        
+    Returns:
+        每页的文本（开启 PDF_PAGE_HEADERS 时带页码标题）
+    """
+    # 使用 with 确保提取出错时也会关闭文档
+    with _open_pdf(pdf_source) as doc:
+        return _pdf_pages_text(doc, start, stop)
+
+
+def _pdf_pages_text(doc, start: int, stop: int) -> List[str]:
+    """提取已打开文档中 [start, stop) 范围内各页的文本"""
+    import fitz  # PyMuPDF
+    
+    # 默认文本模式基础上合并行尾连字符断开的英文单词
+    flags = fitz.TEXTFLAGS_TEXT | fitz.TEXT_DEHYPHENATE
+    
+    # 直接迭代页面，避免按下标重复查找
+    if PDF_PAGE_HEADERS:
+        return [
+            f"--- 第 {page_num} 页 ---\n{page.get_text('text', flags=flags)}"
+            for page_num, page in enumerate(doc.pages(start, stop), start=start + 1)
+        ]
+    return [page.get_text('text', flags=flags) for page in doc.pages(start, stop)]
+
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool():
+    """获取 PDF 文本提取进程池（首次使用时创建）"""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            _pdf_pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS)
+        return _pdf_pool
+
+
+def extract_text_from_pdf(pdf_source: Union[str, bytes]) -> str:
+    """
+    从 PDF 文件中提取文本（页数较多时分段并行提取）
+    
+    Args:
+        pdf_source: PDF 文件路径，或内存中的 PDF 文件内容
+        
+    Returns:
+        提取的文本内容
+    """
+    with _open_pdf(pdf_source) as doc:
+        page_count = doc.page_count
+        # 常见的短简历直接用已打开的文档提取，不再重新打开
+        if page_count < PDF_PARALLEL_MIN_PAGES or PDF_EXTRACT_WORKERS <= 1:
+            return "\n\n".join(_pdf_pages_text(doc, 0, page_count))
+    
+    # 页数较多时每个进程处理连续的一段页面，每段只需打开一次文档
+    if isinstance(pdf_source, memoryview):
+        pdf_source = bytes(pdf_source)
+    step = -(-page_count // PDF_EXTRACT_WORKERS)
+    starts = range(0, page_count, step)
+    pool = _get_pdf_pool()
+    futures = [
+        pool.submit(_extract_pdf_pages, pdf_source, start, min(start + step, page_count))
+        for start in starts
+    ]
+    text_content = [text for future in futures for text in future.result()]
+    
+    return "\n\n".join(text_content)
+
+
+# Word 正文 XML 的命名空间及用到的标签
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_TBL, _W_TR, _W_TC = _W + "p", _W + "tbl", _W + "tr", _W + "tc"
+_W_R, _W_HYPERLINK = _W + "r", _W + "hyperlink"
+_W_T, _W_TAB, _W_BR, _W_CR = _W + "t", _W + "tab", _W + "br", _W + "cr"
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    """段落文本（与 python-docx 的 Paragraph.text 一致：包含超链接中的文字，制表符、换行保留）"""
+    parts = []
+    for child in paragraph:
+        if child.tag == _W_HYPERLINK:
+            runs = [r for r in child if r.tag == _W_R]
+        elif child.tag == _W_R:
+            runs = [child]
+        else:
+            continue
+        for run in runs:
+            for item in run:
+                if item.tag == _W_T:
+                    parts.append(item.text or '')
+                elif item.tag == _W_TAB:
+                    parts.append('\t')
+                elif item.tag in (_W_BR, _W_CR):
+                    parts.append('\n')
+    return ''.join(parts)
+
+
+def _docx_block_text(block) -> List[str]:
+    """正文中一个段落或表格的文本行（表格每行一条，单元格用 | 分隔）"""
+    if block.tag == _W_P:
+        text = _docx_paragraph_text(block)
+        return [text] if text.strip() else []
+    
+    lines = []
+    if block.tag == _W_TBL:
+        for row in block.iter(_W_TR):
+            row_text = []
+            for cell in row:
+                if cell.tag != _W_TC:
+                    continue
+                cell_text = "\n".join(
+                    _docx_paragraph_text(p) for p in cell if p.tag == _W_P
+                ).strip()
+                if cell_text:
+                    row_text.append(cell_text)
+            if row_text:
+                lines.append(" | ".join(row_text))
+    return lines
+
+
+def _iter_docx_body_blocks(docx_source):
+    """
+    流式解析 word/document.xml，按文档顺序逐个返回正文中的段落和表格元素
+    
+    每个元素处理完后即清空，内存中只保留当前这一块
+    """
+    import xml.etree.ElementTree as ET
+    
+    with zipfile.ZipFile(docx_source) as z, z.open("word/document.xml") as f:
+        depth = 0
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            # document(1) > body(2) > 段落 / 表格(3)
+            if depth == 3:
+                yield elem
+                elem.clear()
+            depth -= 1
+
+
+def extract_text_from_docx(docx_source: Union[str, bytes]) -> str:
+    """
+    从 Word (.docx) 文件中提取文本
+    
+    直接从压缩包中流式读取正文 XML，按文档顺序输出段落和表格，不构建 python-docx 的文档对象；
+    文件结构不标准时退回 python-docx 解析
+    
+    Args:
+        docx_source: Word 文件路径，或内存中的 Word 文件内容
+        
+    Returns:
+        提取的文本内容
+    """
+    if isinstance(docx_source, (bytes, bytearray, memoryview)):
+        docx_source = io.BytesIO(docx_source)
+    
+    try:
+        blocks = _iter_docx_body_blocks(docx_source)
+        text_content = [line for block in blocks for line in _docx_block_text(block)]
+    except (KeyError, zipfile.BadZipFile, SyntaxError):
+        # 正文不在 word/document.xml、压缩包或 XML 异常（ParseError 是 SyntaxError 的子类）
+        from docx import Document  # python-docx
+        
+        if hasattr(docx_source, "seek"):
+            docx_source.seek(0)
+        doc = Document(docx_source)
+        text_content = [line for block in doc.element.body for line in _docx_block_text(block)]
+    
+    return "\n".join(text_content)
+
+
+def extract_text_from_resume(file_path: str, content: Optional[bytes] = None) -> str:
+    """
+    根据文件类型自动选择提取方法（提取结果按文件内容缓存在 TEXT_CACHE_DIR）
+    
+    Args:
+        file_path: 简历文件路径或文件名（支持 .pdf, .docx）
+        content: 文件内容（可选）。传入时直接从内存解析，不再读取磁盘，
+                 此时 file_path 仅用于判断文件格式
+        
+    Returns:
+        提取的文本内容
+        
+    Raises:
+        ValueError: 不支持的文件格式
+    """
+    file_path = Path(file_path)
+    suffix = file_path.suffix.lower()
+    
+    if suffix == '.pdf':
+        extract = extract_text_from_pdf
+    elif suffix == '.docx':
+        extract = extract_text_from_docx
+    elif suffix == '.doc':
+        raise ValueError("不支持 .doc 格式，请将文件另存为 .docx 格式")
+    else:
+        raise ValueError(f"不支持的文件格式: {suffix}，支持的格式: .pdf, .docx")
+    
+    if TEXT_CACHE_MAX_MB <= 0:
+        return extract(content if content is not None else str(file_path))
+    
+    # 按文件内容缓存提取结果：文件读入内存后只读一次，同时用于计算哈希和提取
+    if content is None:
+        content = file_path.read_bytes()
+    cache_path = TEXT_CACHE_DIR / f"{_text_cache_key(suffix, content)}.txt"
+    try:
+        text = cache_path.read_text(encoding="utf-8")
+        os.utime(cache_path)  # 刷新修改时间，清理时按最近使用顺序保留
+        return text
+    except OSError:
+        pass
+    
+    text = extract(content)
+    _text_cache_set(cache_path, text)
+    return text
+
+
+def _text_cache_key(suffix: str, content: bytes) -> str:
+    """文本提取缓存 key：文件内容哈希 + 提取逻辑版本 + 解析库版本"""
+    if suffix == '.pdf':
+        import fitz  # PyMuPDF
+        library_version = fitz.VersionBind
+    else:
+        library_version = ""
+    return _llm_cache_key("text", suffix, TEXT_EXTRACTOR_VERSION, library_version, hashlib.sha256(content).hexdigest())
+
+
+def _text_cache_set(cache_path: Path, text: str) -> None:
+    """保存提取的文本，目录超过 TEXT_CACHE_MAX_MB 时删除最久未使用的文件（写入失败不影响主流程）"""
+    try:
+        TEXT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _atomic_write_bytes(cache_path, text.encode("utf-8"))
+        _trim_cache_dir(TEXT_CACHE_DIR, ".txt", TEXT_CACHE_MAX_MB)
+    except OSError as e:
+        print(f"写入文本提取缓存失败: {e}")
+
+
+def _strip_markdown_fence(result_text: str) -> str:
+    """去掉模型返回内容外层可能包裹的 markdown 代码块标记"""
+    result_text = result_text.strip()
+    if result_text.startswith("```"):
+        lines = result_text.split("\n")
+        start_idx = 1 if lines[0].startswith("```") else 0
+        end_idx = -1 if lines[-1].strip() == "```" else len(lines)
+        result_text = "\n".join(lines[start_idx:end_idx])
+    return result_text
+
+
+_PAGE_MARKER_RE = re.compile(r"--- 第 \d+ 页 ---")
+_INLINE_SPACE_RE = re.compile(r"[ \t\u3000\xa0]{2,}")
+
+
+def _compact_resume_text(resume_text: str) -> str:
+    """
+    压缩简历文本以减少输入 token：去掉页码标记和行首尾空白，行内连续空白合并为一个空格，
+    与上一行完全相同的行只保留一行，多个空行合并为一个。
+    不相邻的重复行（如分布在各页的页眉页脚）保留不动：简历中的短行（职务、"项目职责"等）
+    经常在不同经历中合法地重复出现，按内容去重会丢失信息
+    """
+    lines = []
+    previous = None
+    pending_blank = False
+    for line in _PAGE_MARKER_RE.sub("", resume_text).splitlines():
+        line = _INLINE_SPACE_RE.sub(" ", line).strip()
+        if not line:
+            pending_blank = bool(lines)
+            continue
+        if line == previous:
+            continue
+        if pending_blank:
+            lines.append("")
+            pending_blank = False
+        lines.append(line)
+        previous = line
+    return "\n".join(lines)
+
+
+def _prepare_resume_text(resume_text: str):
+    """
+    调用 LLM 前检查简历文本
+    
+    Args:
+        resume_text: 提取出的简历文本
+        
+    Returns:
+        (待发送的文本, 错误信息)。文本先经过压缩；过短时错误信息不为空；
+        过长时只保留开头和结尾部分
+    """
+    resume_text = _compact_resume_text(resume_text)
+    if len(resume_text) < MIN_RESUME_TEXT_CHARS or len(set(resume_text)) < MIN_RESUME_UNIQUE_CHARS:
+        return resume_text, "简历文本过短，可能是扫描件或文件已损坏，请上传可选中文字的 PDF 或 Word 文件"
+    
+    if len(resume_text) > MAX_RESUME_TEXT_CHARS:
+        # 基本信息和教育经历通常在开头，保留更多开头内容
+        head_len = MAX_RESUME_TEXT_CHARS * 2 // 3
+        tail_len = MAX_RESUME_TEXT_CHARS - head_len
+        print(f"简历文本过长（{len(resume_text)} 字符），仅发送首尾 {MAX_RESUME_TEXT_CHARS} 字符")
+        resume_text = f"{resume_text[:head_len]}\n\n……（中间内容过长已省略）……\n\n{resume_text[-tail_len:]}"
+    
+    return resume_text, None
+
+
+def _log_token_usage(usage) -> None:
+    """打印本次请求的 token 用量（含前缀缓存命中数，用于确认提示词缓存是否生效）"""
+    if usage is None:
+        return
+    # DeepSeek 返回 prompt_cache_hit_tokens，OpenAI 返回 prompt_tokens_details.cached_tokens
+    cached = getattr(usage, "prompt_cache_hit_tokens", None)
+    if cached is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+    print(f"Token 用量: 输入 {usage.prompt_tokens} (缓存命中 {cached})，输出 {usage.completion_tokens}")
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """
+    计算 LLM 请求失败后重试前的等待时间
+    
+    指数退避（1s、2s、4s …，最多 LLM_MAX_BACKOFF 秒）并加上随机抖动，避免并发请求同时重试；
+    被限流时优先遵循服务端返回的 Retry-After
+    
+    Args:
+        error: 本次失败的异常
+        attempt: 当前尝试次数（从 0 开始）
+        
+    Returns:
+        等待秒数；认证失败、参数错误等重试也不会成功的错误返回 None
+    """
+    import openai
+    
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError,
+                          openai.BadRequestError, openai.NotFoundError)):
+        return None
+    
+    jitter = random.uniform(0, 1)
+    if isinstance(error, openai.RateLimitError):
+        try:
+            return min(LLM_MAX_BACKOFF, float(error.response.headers["retry-after"])) + jitter
+        except (KeyError, TypeError, ValueError):
+            pass
+    return min(LLM_MAX_BACKOFF, 2 ** attempt) + jitter
+
+
+def _read_stream(stream, on_progress: Callable[[int], None]) -> str:
+    """逐块读取流式响应，每收到内容就回调一次已接收的字符数"""
+    parts = []
+    received = 0
+    for chunk in stream:
+        _log_token_usage(getattr(chunk, "usage", None))
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            received += len(delta)
+            on_progress(received)
+    return "".join(parts)
+
+
+async def _read_stream_async(stream, on_progress: Callable[[int], None]) -> str:
+    """_read_stream 的异步版本"""
+    parts = []
+    received = 0
+    async for chunk in stream:
+        _log_token_usage(getattr(chunk, "usage", None))
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            received += len(delta)
+            on_progress(received)
+    return "".join(parts)
+
+
+def parse_resume_with_llm(resume_text: str, on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    使用 LLM 解析简历文本，提取结构化信息
+    
+    Args:
+        resume_text: 简历文本内容
+        on_progress: 进度回调（可选）。传入时使用流式响应，每收到一段内容
+                     就以已接收的字符数调用一次，便于界面实时显示进度
+        
+    Returns:
+        解析后的结构化信息
+    """
+    resume_text, error = _prepare_resume_text(resume_text)
+    if error:
+        return {"error": error}
+    
+    user_prompt = USER_PROMPT_TEMPLATE.format(resume_text=resume_text)
+
+    # 相同模型 + 相同提示词（含简历文本）直接返回缓存结果
+    cache_key = _llm_cache_key(AI_MODEL, SYSTEM_PROMPT, user_prompt)
+    cached_result = _llm_cache_get(cache_key)
+    if cached_result is not None:
+        print("命中 LLM 缓存，跳过 API 调用")
+        return cached_result
+
+    # 未配置 API Key 时直接报错，重试也不会成功
+    if not DEEPSEEK_API_KEY:
+        return {"error": MISSING_API_KEY_MESSAGE}
+    
+    max_retries = LLM_MAX_RETRIES
     for attempt in range(max_retries):
         try:
-            response = client.chat.completions.create(
+            delay = _reserve_request_slot()
+            if delay > 0:
+                time.sleep(delay)
+            response = _get_client().chat.completions.create(
                 model=AI_MODEL,
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt}
                 ],
                 timeout=AI_TIMEOUT,
+                stream=on_progress is not None,
+                # 流式响应默认不返回用量，要求在最后一块中附带
+                **({"stream_options": {"include_usage": True}} if on_progress is not None else {}),
+                # JSON 模式保证返回可解析的 JSON；温度为 0 使同一简历的结果稳定，缓存才有意义
+                response_format={"type": "json_object"},
+                temperature=0,
             )
             
-            result_text = response.choices[0].message.content.strip()
-            
-            # 尝试提取 JSON（处理可能的 markdown 代码块包装）
-            if result_text.startswith("```"):
-                # 移除 markdown 代码块标记
-                lines = result_text.split("\n")
-                start_idx = 1 if lines[0].startswith("```") else 0
-                end_idx = -1 if lines[-1].strip() == "```" else len(lines)
-                result_text = "\n".join(lines[start_idx:end_idx])
+            if on_progress is not None:
+                result_text = _strip_markdown_fence(_read_stream(response, on_progress))
+            else:
+                _log_token_usage(response.usage)
+                result_text = _strip_markdown_fence(response.choices[0].message.content)
             
             # 解析 JSON
-            parsed_result = json.loads(result_text)
+            parsed_result = _json_loads(result_text)
+            _llm_cache_set(cache_key, parsed_result)
             return parsed_result
             
         except json.JSONDecodeError as e:
-            print(f"JSON 解析错误: {e}")
+            # 返回内容不是有效 JSON（如输出被截断）时同样重试
+            print(f"JSON 解析错误 (尝试 {attempt + 1}/{max_retries}): {e}")
             print(f"原始响应: {result_text}")
-            return {"error": "JSON 解析失败", "raw_response": result_text}
+            error = {"error": "JSON 解析失败", "raw_response": result_text}
+            wait_time = _retry_delay(e, attempt)
         except Exception as e:
             print(f"API 调用错误 (尝试 {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                wait_time = (attempt + 1) * 3
-                print(f"等待 {wait_time} 秒后重试...")
-                time.sleep(wait_time)
+            error = {"error": str(e)}
+            wait_time = _retry_delay(e, attempt)
+        
+        if wait_time is None:
+            break
+        if attempt < max_retries - 1:
+            print(f"等待 {wait_time:.1f} 秒后重试...")
+            time.sleep(wait_time)
+    
+    return error
+
+
+async def parse_resume_with_llm_async(resume_text: str, on_progress: Optional[Callable[[int], None]] = None) -> dict:
+    """
+    parse_resume_with_llm 的异步版本，供批量处理时在同一事件循环中并发调用
+    
+    与同步版本共用提示词、结果缓存和指数退避重试策略。
+    
+    Args:
+        resume_text: 简历文本内容
+        on_progress: 进度回调（可选），含义同 parse_resume_with_llm
+        
+    Returns:
+        解析后的结构化信息
+    """
+    resume_text, error = _prepare_resume_text(resume_text)
+    if error:
+        return {"error": error}
+    
+    user_prompt = USER_PROMPT_TEMPLATE.format(resume_text=resume_text)
+
+    cache_key = _llm_cache_key(AI_MODEL, SYSTEM_PROMPT, user_prompt)
+    cached_result = _llm_cache_get(cache_key)
+    if cached_result is not None:
+        print("命中 LLM 缓存，跳过 API 调用")
+        return cached_result
+
+    # 未配置 API Key 时直接报错，重试也不会成功
+    if not DEEPSEEK_API_KEY:
+        return {"error": MISSING_API_KEY_MESSAGE}
+    
+    max_retries = LLM_MAX_RETRIES
+    for attempt in range(max_retries):
+        try:
+            delay = _reserve_request_slot()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = await _get_async_client().chat.completions.create(
+                model=AI_MODEL,
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                timeout=AI_TIMEOUT,
+                stream=on_progress is not None,
+                # 流式响应默认不返回用量，要求在最后一块中附带
+                **({"stream_options": {"include_usage": True}} if on_progress is not None else {}),
+                # JSON 模式保证返回可解析的 JSON；温度为 0 使同一简历的结果稳定，缓存才有意义
+                response_format={"type": "json_object"},
+                temperature=0,
+            )
+            
+            if on_progress is not None:
+                result_text = _strip_markdown_fence(await _read_stream_async(response, on_progress))
             else:
-                return {"error": str(e)}
+                _log_token_usage(response.usage)
+                result_text = _strip_markdown_fence(response.choices[0].message.content)
+            
+            parsed_result = _json_loads(result_text)
+            _llm_cache_set(cache_key, parsed_result)
+            return parsed_result
+            
+        except json.JSONDecodeError as e:
+            # 返回内容不是有效 JSON（如输出被截断）时同样重试
+            print(f"JSON 解析错误 (尝试 {attempt + 1}/{max_retries}): {e}")
+            print(f"原始响应: {result_text}")
+            error = {"error": "JSON 解析失败", "raw_response": result_text}
+            wait_time = _retry_delay(e, attempt)
+        except Exception as e:
+            print(f"API 调用错误 (尝试 {attempt + 1}/{max_retries}): {e}")
+            error = {"error": str(e)}
+            wait_time = _retry_delay(e, attempt)
+        
+        if wait_time is None:
+            break
+        if attempt < max_retries - 1:
+            print(f"等待 {wait_time:.1f} 秒后重试...")
+            await asyncio.sleep(wait_time)
+    
+    return error
 
 
 def main():
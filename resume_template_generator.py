@@ -7,18 +7,161 @@
 
 import json
 import copy
+import io
 import os
 import re
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Optional
-from openpyxl import load_workbook
+from typing import Any, BinaryIO, Optional, Union
+from openpyxl import load_workbook, Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border
+from openpyxl.styles.cell_style import StyleArray
 from openpyxl.utils import get_column_letter
 
 
+# 模板文件内容缓存：模板绝对路径 -> (文件修改时间, 文件内容)
+# 模板只从磁盘读取一次，之后每次从内存解析。
+# 注意：不能缓存 Workbook 对象再深拷贝，openpyxl 深拷贝后的样式表会错乱。
+# 也不能使用 write_only 模式：生成过程需要插入行、复制行样式、合并单元格并
+# 回写已有单元格，这些都依赖完整的内存单元格网格；模板仅一个工作表、几十行，
+# 逐行流式写出省下的开销也可以忽略。
+_template_cache = {}
+_template_cache_lock = threading.Lock()
+
+
+def preload_template(template_path: str) -> bytes:
+    """
+    读取模板文件内容到缓存（文件修改后自动重新读取）
+    
+    Args:
+        template_path: Excel模板文件路径
+        
+    Returns:
+        模板文件内容
+    """
+    path = Path(template_path).resolve()
+    mtime = path.stat().st_mtime_ns
+    
+    with _template_cache_lock:
+        cached = _template_cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, path.read_bytes())
+            _template_cache[path] = cached
+    
+    return cached[1]
+
+
+def _load_template(template_path: str) -> Workbook:
+    """
+    加载模板工作簿（模板文件内容带缓存）
+    
+    Args:
+        template_path: Excel模板文件路径
+        
+    Returns:
+        新解析的模板工作簿，可随意修改
+    """
+    # 模板不含外部链接，跳过外部链接部件的解析
+    return load_workbook(io.BytesIO(preload_template(template_path)), keep_links=False)
+
+
+# 日期格式正则（模块加载时编译一次）
+_RE_ISO_YM = re.compile(r'^\d{4}-\d{2}$')
+_RE_ISO_Y1 = re.compile(r'^\d{4}-\d{1}$')
+_RE_Y = re.compile(r'^\d{4}$')
+_RE_CN_FULL = re.compile(r'^(\d{4})年(\d{1,2})月(\d{1,2})日?$')
+_RE_CN_YM = re.compile(r'^(\d{4})年(\d{1,2})月$')
+
+# 一位数月/日补零查表（"1" -> "01"），两位数原样使用
+_PAD2 = {str(i): f"0{i}" for i in range(10)}
+
+
+def _pad2(value: str) -> str:
+    """月/日补齐为两位（ASCII 一位数查表，其他情况如全角数字退回 zfill）"""
+    padded = _PAD2.get(value)
+    return padded if padded is not None else value.zfill(2)
+
+
+# 单元格值格式化：按 JSON 值的具体类型查表，其他类型统一转为字符串
+_CELL_FORMATTERS = {
+    str: str,
+    bool: lambda v: "是" if v else "否",
+    list: lambda v: "、".join(str(x) for x in v),
+}
+
+
+def _format_date(date_str: Optional[str]) -> Optional[str]:
+    """
+    格式化日期为 YYYY-MM-DD 格式
+    
+    支持的输入格式：
+    - YYYY-MM-DD → 原样返回
+    - YYYY-MM → 补全为 YYYY-MM-01
+    - YYYY → 补全为 YYYY-01-01
+    - YYYY年MM月DD日 → 转换为 YYYY-MM-DD
+    - YYYY年MM月 → 转换为 YYYY-MM-01
+    - None/空 → 返回 None
+    
+    Args:
+        date_str: 原始日期字符串
+        
+    Returns:
+        格式化后的日期字符串，或 None
+    """
+    # None/空串在缓存之外直接返回，缓存只存真实的日期字符串
+    if not date_str or date_str.strip() == "":
+        return None
+    return _format_date_str(date_str.strip())
+
+
+@lru_cache(maxsize=512)
+def _format_date_str(date_str: str) -> str:
+    """格式化已去除首尾空白的非空日期字符串（结果缓存，相同日期只解析一次）"""
+    # 已经是 YYYY-MM-DD 格式（最常见，先用字符判断跳过正则）
+    if (len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-'
+            and date_str[:4].isdecimal() and date_str[5:7].isdecimal()
+            and date_str[8:].isdecimal()):
+        return date_str
+    
+    # YYYY-MM 格式，补全日期为 01
+    if _RE_ISO_YM.match(date_str):
+        return f"{date_str}-01"
+    
+    # YYYY-M 格式（单位数月份），补全为 YYYY-0M-01
+    if _RE_ISO_Y1.match(date_str):
+        parts = date_str.split('-')
+        return f"{parts[0]}-0{parts[1]}-01"
+    
+    # YYYY 格式，补全为 YYYY-01-01
+    if _RE_Y.match(date_str):
+        return f"{date_str}-01-01"
+    
+    # 中文格式：YYYY年MM月DD日
+    match = _RE_CN_FULL.match(date_str)
+    if match:
+        year, month, day = match.groups()
+        return f"{year}-{_pad2(month)}-{_pad2(day)}"
+    
+    # 中文格式：YYYY年MM月
+    match = _RE_CN_YM.match(date_str)
+    if match:
+        year, month = match.groups()
+        return f"{year}-{_pad2(month)}-01"
+    
+    # 其他格式，原样返回
+    return date_str
+
+
 class ResumeTemplateGenerator:
     """简历模板生成器"""
     
+    # 实例属性固定，使用 __slots__ 省去实例字典
+    __slots__ = (
+        "template_path", "wb", "ws", "row_offset",
+        "_highlight_font_id", "_highlight_fill_id",
+    )
+    
     # 高亮样式 - 用于null值
     HIGHLIGHT_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
     HIGHLIGHT_FONT = Font(color="FF0000", bold=True)
@@ -43,66 +186,24 @@ class ResumeTemplateGenerator:
             template_path: Excel模板文件路径
         """
         self.template_path = Path(template_path)
-        self.wb = load_workbook(template_path)
+        self.wb = _load_template(template_path)
         self.ws = self.wb.active
         self.row_offset = 0  # 跟踪因插入行导致的偏移
+        # 高亮字体/填充在工作簿样式表中只登记一次，之后直接写下标
+        self._highlight_font_id = self.wb._fonts.add(self.HIGHLIGHT_FONT)
+        self._highlight_fill_id = self.wb._fills.add(self.HIGHLIGHT_FILL)
     
-    @staticmethod
-    def _format_date(date_str: Optional[str]) -> Optional[str]:
+    def _apply_highlight(self, cell) -> None:
         """
-        格式化日期为 YYYY-MM-DD 格式
-        
-        支持的输入格式：
-        - YYYY-MM-DD → 原样返回
-        - YYYY-MM → 补全为 YYYY-MM-01
-        - YYYY → 补全为 YYYY-01-01
-        - YYYY年MM月DD日 → 转换为 YYYY-MM-DD
-        - YYYY年MM月 → 转换为 YYYY-MM-01
-        - None/空 → 返回 None
+        对待补充单元格应用高亮（只替换字体和填充，保留边框、对齐等原有样式）
         
-        Args:
-            date_str: 原始日期字符串
-            
-        Returns:
-            格式化后的日期字符串，或 None
+        不使用命名样式：设置 cell.style 会整体替换单元格样式，丢失模板边框。
         """
-        if not date_str or date_str.strip() == "":
-            return None
-        
-        date_str = date_str.strip()
-        
-        # 已经是 YYYY-MM-DD 格式
-        if re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-            return date_str
-        
-        # YYYY-MM 格式，补全日期为 01
-        if re.match(r'^\d{4}-\d{2}$', date_str):
-            return f"{date_str}-01"
-        
-        # YYYY-M 格式（单位数月份），补全为 YYYY-0M-01
-        if re.match(r'^\d{4}-\d{1}$', date_str):
-            parts = date_str.split('-')
-            return f"{parts[0]}-0{parts[1]}-01"
-        
-        # YYYY 格式，补全为 YYYY-01-01
-        if re.match(r'^\d{4}$', date_str):
-            return f"{date_str}-01-01"
-        
-        # 中文格式：YYYY年MM月DD日
-        match = re.match(r'^(\d{4})年(\d{1,2})月(\d{1,2})日?$', date_str)
-        if match:
-            year, month, day = match.groups()
-            return f"{year}-{month.zfill(2)}-{day.zfill(2)}"
-        
-        # 中文格式：YYYY年MM月
-        match = re.match(r'^(\d{4})年(\d{1,2})月$', date_str)
-        if match:
-            year, month = match.groups()
-            return f"{year}-{month.zfill(2)}-01"
-        
-        # 其他格式，原样返回
-        return date_str
-        
+        if not cell._style:
+            cell._style = StyleArray()
+        cell._style.fontId = self._highlight_font_id
+        cell._style.fillId = self._highlight_fill_id
+    
     def _get_actual_row(self, base_row: int) -> int:
         """获取考虑偏移后的实际行号"""
         return base_row + self.row_offset
@@ -118,40 +219,33 @@ class ResumeTemplateGenerator:
             apply_offset: 是否应用行偏移
             is_date: 是否为日期字段，如果是则自动格式化
         """
-        actual_row = self._get_actual_row(row) if apply_offset else row
-        cell = self.ws.cell(row=actual_row, column=col)
+        # 直接加偏移，每次写单元格少一次方法调用
+        actual_row = row + self.row_offset if apply_offset else row
+        cell = self.ws.cell(actual_row, col)
         
         # 如果是日期字段，先格式化
         if is_date and value:
-            value = self._format_date(value)
+            value = _format_date(value)
         
-        if value is None or value == "" or value == []:
+        # 空列表直接按真值判断，不再构造临时列表做比较
+        if value is None or value == "" or (isinstance(value, list) and not value):
             cell.value = "【待补充】"
-            cell.fill = self.HIGHLIGHT_FILL
-            cell.font = self.HIGHLIGHT_FONT
-        elif isinstance(value, list):
-            cell.value = "、".join(str(v) for v in value) if value else "【待补充】"
-            if not value:
-                cell.fill = self.HIGHLIGHT_FILL
-                cell.font = self.HIGHLIGHT_FONT
-        elif isinstance(value, bool):
-            cell.value = "是" if value else "否"
+            self._apply_highlight(cell)
         else:
-            cell.value = str(value)
+            cell.value = _CELL_FORMATTERS.get(type(value), str)(value)
     
     def _copy_row_style(self, source_row: int, target_row: int, num_cols: int = 15) -> None:
         """复制行样式"""
+        ws_cell = self.ws.cell
         for col in range(1, num_cols + 1):
-            source_cell = self.ws.cell(row=source_row, column=col)
-            target_cell = self.ws.cell(row=target_row, column=col)
+            source_cell = ws_cell(source_row, col)
+            target_cell = ws_cell(target_row, col)
             
-            if source_cell.has_style:
-                target_cell.font = copy.copy(source_cell.font)
-                target_cell.border = copy.copy(source_cell.border)
-                target_cell.fill = copy.copy(source_cell.fill)
-                target_cell.number_format = copy.copy(source_cell.number_format)
-                target_cell.protection = copy.copy(source_cell.protection)
-                target_cell.alignment = copy.copy(source_cell.alignment)
+            # 目标单元格样式已相同时（如重复插入的行）无需复制
+            if source_cell.has_style and source_cell._style != target_cell._style:
+                # 直接复制样式索引数组（字体/边框/填充/格式等都是工作簿共享样式表
+                # 中的下标），避免逐个属性复制对象后再回查样式表去重
+                target_cell._style = copy.copy(source_cell._style)
     
     def _insert_rows_with_style(self, start_row: int, num_rows: int, template_row: int) -> None:
         """插入行并复制样式"""
@@ -204,7 +298,8 @@ class ResumeTemplateGenerator:
         doctoral = None       # 博士
         
         for edu in education_list:
-            degree_type = edu.get("degree_type", "")
+            # 模型可能返回 "degree_type": null，按空字符串处理
+            degree_type = edu.get("degree_type") or ""
             if "本科" in degree_type:
                 undergraduate = edu
             elif "硕士" in degree_type:
@@ -255,7 +350,7 @@ class ResumeTemplateGenerator:
         
         # 更新标题（如果是博士）
         if degree_label == "博士":
-            self.ws.cell(row=self._get_actual_row(base_row), column=1).value = "博士学历"
+            self.ws.cell(self._get_actual_row(base_row), 1).value = "博士学历"
         
         # 入学时间 - B23, 毕业院校 - D23
         self._fill_cell(base_row + 1, 2, edu.get("enrollment_date"), is_date=True)
@@ -300,8 +395,9 @@ class ResumeTemplateGenerator:
         
         # 修复工作经历区域被错误合并的单元格
         # insert_rows 可能导致错误的合并，需要清理
+        # 先收集再统一取消合并，遍历期间不修改合并区域集合，因此无需先复制成列表
         merged_to_fix = []
-        for merged_range in list(self.ws.merged_cells.ranges):
+        for merged_range in self.ws.merged_cells.ranges:
             # 工作经历表头行（Row 32+9=41）如果被整行合并，需要修复
             if merged_range.min_row == work_exp_header_row:
                 if merged_range.min_col == 1 and merged_range.max_col >= 3:
@@ -319,12 +415,14 @@ class ResumeTemplateGenerator:
             end_row=work_exp_header_row, end_column=6
         )
         
+        ws_cell = self.ws.cell
+        
         # 恢复工作经历表头的值（insert_rows 可能导致值丢失）
-        self.ws.cell(row=work_exp_header_row, column=1).value = "工作开始日期（年月日）"
-        self.ws.cell(row=work_exp_header_row, column=2).value = "工作结束日期（年月日）"
-        self.ws.cell(row=work_exp_header_row, column=3).value = "单位名称"
-        self.ws.cell(row=work_exp_header_row, column=4).value = "岗位/职务"
-        self.ws.cell(row=work_exp_header_row, column=5).value = "是否邮储银行自主研发工作经验"
+        ws_cell(work_exp_header_row, 1).value = "工作开始日期（年月日）"
+        ws_cell(work_exp_header_row, 2).value = "工作结束日期（年月日）"
+        ws_cell(work_exp_header_row, 3).value = "单位名称"
+        ws_cell(work_exp_header_row, 4).value = "岗位/职务"
+        ws_cell(work_exp_header_row, 5).value = "是否邮储银行自主研发工作经验"
         
         # 复制研究生区域的样式（从Row 22开始）
         source_base = 22  # 研究生学历的原始起始行
@@ -338,22 +436,22 @@ class ResumeTemplateGenerator:
         )
         
         # 填充博士学历标签
-        self.ws.cell(row=insert_row, column=1).value = "博士学历"
+        ws_cell(insert_row, 1).value = "博士学历"
         
         # 填充字段标签
-        self.ws.cell(row=insert_row + 1, column=1).value = "入学时间"
-        self.ws.cell(row=insert_row + 1, column=3).value = "毕业院校"
-        self.ws.cell(row=insert_row + 2, column=1).value = "毕业时间"
-        self.ws.cell(row=insert_row + 2, column=3).value = "专业"
-        self.ws.cell(row=insert_row + 3, column=1).value = "毕业证编号"
-        self.ws.cell(row=insert_row + 4, column=1).value = "毕业证学信网在线验证码"
-        self.ws.cell(row=insert_row + 6, column=1).value = "学位证编号"
-        self.ws.cell(row=insert_row + 7, column=1).value = "学位证学信网在线验证码"
+        ws_cell(insert_row + 1, 1).value = "入学时间"
+        ws_cell(insert_row + 1, 3).value = "毕业院校"
+        ws_cell(insert_row + 2, 1).value = "毕业时间"
+        ws_cell(insert_row + 2, 3).value = "专业"
+        ws_cell(insert_row + 3, 1).value = "毕业证编号"
+        ws_cell(insert_row + 4, 1).value = "毕业证学信网在线验证码"
+        ws_cell(insert_row + 6, 1).value = "学位证编号"
+        ws_cell(insert_row + 7, 1).value = "学位证学信网在线验证码"
         
         # 填充博士学历数据
-        enrollment_date = self._format_date(edu.get("enrollment_date"))
+        enrollment_date = _format_date(edu.get("enrollment_date"))
         university = edu.get("university")
-        graduation_date = self._format_date(edu.get("graduation_date"))
+        graduation_date = _format_date(edu.get("graduation_date"))
         major = edu.get("major")
         diploma_number = edu.get("diploma_number")
         diploma_code = edu.get("diploma_verification_code")
@@ -373,11 +471,10 @@ class ResumeTemplateGenerator:
         ]
         
         for row, col, value in cells_data:
-            cell = self.ws.cell(row=row, column=col)
+            cell = ws_cell(row, col)
             if value is None or value == "":
                 cell.value = "【待补充】"
-                cell.fill = self.HIGHLIGHT_FILL
-                cell.font = self.HIGHLIGHT_FONT
+                self._apply_highlight(cell)
             else:
                 cell.value = value
     
@@ -407,7 +504,7 @@ class ResumeTemplateGenerator:
         # 在填充数据前，取消工作经历数据区域的合并单元格（保留表头和标题的合并）
         # 数据区域是从 data_start_row 开始的 num_items 行
         merged_ranges_to_remove = []
-        for merged_range in list(self.ws.merged_cells.ranges):
+        for merged_range in self.ws.merged_cells.ranges:
             # 只取消数据行（不包括表头）的 B:F 合并
             if (merged_range.min_row >= data_start_row and 
                 merged_range.min_row < data_start_row + num_items and
@@ -420,39 +517,38 @@ class ResumeTemplateGenerator:
             except:
                 pass
         
+        ws_cell = self.ws.cell
+        
         # 填充所有工作经历数据
         for i, exp in enumerate(work_exp):
             row = data_start_row + i
             
-            start_date = self._format_date(exp.get("start_date"))
-            end_date = self._format_date(exp.get("end_date"))
+            start_date = _format_date(exp.get("start_date"))
+            end_date = _format_date(exp.get("end_date"))
             company = exp.get("company")
             position = exp.get("position")
             is_psbc = exp.get("is_psbc_independent_dev")
             
-            self.ws.cell(row=row, column=1).value = start_date if start_date else "【待补充】"
-            self.ws.cell(row=row, column=2).value = end_date if end_date else "【待补充】"
-            self.ws.cell(row=row, column=3).value = company if company else "【待补充】"
-            self.ws.cell(row=row, column=4).value = position if position else "【待补充】"
-            
-            if is_psbc is None:
-                self.ws.cell(row=row, column=5).value = "【待补充】"
-            else:
-                self.ws.cell(row=row, column=5).value = "是" if is_psbc else "否"
-            
-            # 对null值应用高亮
-            for col in range(1, 6):
-                cell = self.ws.cell(row=row, column=col)
-                if cell.value == "【待补充】":
-                    cell.fill = self.HIGHLIGHT_FILL
-                    cell.font = self.HIGHLIGHT_FONT
+            # 先组装整行的值，再逐列写入并对null值应用高亮
+            values = (
+                start_date if start_date else "【待补充】",
+                end_date if end_date else "【待补充】",
+                company if company else "【待补充】",
+                position if position else "【待补充】",
+                "【待补充】" if is_psbc is None else ("是" if is_psbc else "否"),
+            )
+            for col, value in enumerate(values, 1):
+                cell = ws_cell(row, col)
+                cell.value = value
+                if value == "【待补充】":
+                    self._apply_highlight(cell)
         
         # 如果工作经历数量少于模板示例行数，清空多余的示例行
         if num_items < template_rows:
             for i in range(num_items, template_rows):
                 row = data_start_row + i
                 for col in range(1, 6):
-                    self.ws.cell(row=row, column=col).value = None
+                    ws_cell(row, col).value = None
 
     def fill_project_experience(self, data: dict) -> None:
         """填充项目经历（动态行）"""
@@ -474,7 +570,7 @@ class ResumeTemplateGenerator:
             
             # 在插入行之前，先取消可能受影响的合并单元格
             merged_ranges_to_remove = []
-            for merged_range in list(self.ws.merged_cells.ranges):
+            for merged_range in self.ws.merged_cells.ranges:
                 # 检查合并单元格是否在插入位置之后
                 if merged_range.min_row >= insert_position:
                     merged_ranges_to_remove.append(merged_range)
@@ -494,44 +590,33 @@ class ResumeTemplateGenerator:
             
             self.row_offset += extra_rows
         
+        ws_cell = self.ws.cell
+        
         # 填充所有项目经历数据 - 使用直接写入而不是通过 _fill_cell
         for i, exp in enumerate(project_exp):
             row = data_start_row + i
             
-            start_date = self._format_date(exp.get("start_date"))
-            end_date = self._format_date(exp.get("end_date"))
+            start_date = _format_date(exp.get("start_date"))
+            end_date = _format_date(exp.get("end_date"))
             project_name = exp.get("project_name")
             description = exp.get("description")
             role = exp.get("role")
             is_psbc = exp.get("is_psbc_independent_dev")
             
-            # 直接写入单元格值
-            cell1 = self.ws.cell(row=row, column=1)
-            cell1.value = start_date if start_date else "【待补充】"
-            
-            cell2 = self.ws.cell(row=row, column=2)
-            cell2.value = end_date if end_date else "【待补充】"
-            
-            cell3 = self.ws.cell(row=row, column=3)
-            cell3.value = project_name if project_name else "【待补充】"
-            
-            cell4 = self.ws.cell(row=row, column=4)
-            cell4.value = description if description else "【待补充】"
-            
-            cell5 = self.ws.cell(row=row, column=5)
-            cell5.value = role if role else "【待补充】"
-            
-            cell6 = self.ws.cell(row=row, column=6)
-            if is_psbc is None:
-                cell6.value = "【待补充】"
-            else:
-                cell6.value = "是" if is_psbc else "否"
-            
-            # 对null值应用高亮
-            for cell in [cell1, cell2, cell3, cell4, cell5, cell6]:
-                if cell.value == "【待补充】":
-                    cell.fill = self.HIGHLIGHT_FILL
-                    cell.font = self.HIGHLIGHT_FONT
+            # 先组装整行的值，再逐列直接写入并对null值应用高亮
+            values = (
+                start_date if start_date else "【待补充】",
+                end_date if end_date else "【待补充】",
+                project_name if project_name else "【待补充】",
+                description if description else "【待补充】",
+                role if role else "【待补充】",
+                "【待补充】" if is_psbc is None else ("是" if is_psbc else "否"),
+            )
+            for col, value in enumerate(values, 1):
+                cell = ws_cell(row, col)
+                cell.value = value
+                if value == "【待补充】":
+                    self._apply_highlight(cell)
     
     def fill_technical_skills(self, data: dict) -> None:
         """填充技术特长"""
@@ -547,46 +632,68 @@ class ResumeTemplateGenerator:
         # 专业证书 - B44
         self._fill_cell(base_row + 3, 2, skills.get("certifications"))
     
-    def generate(self, resume_data: dict, output_path: str) -> str:
+    def generate(self, resume_data: dict, output: Union[str, BinaryIO], verbose: bool = False) -> str:
         """
         生成填充后的简历文档
         
         Args:
             resume_data: 解析后的简历JSON数据
-            output_path: 输出文件路径
+            output: 输出文件路径，或可写的二进制文件对象（如 io.BytesIO）
+            verbose: 是否打印填充步骤和生成结果（桌面端进程池生成时关闭）
             
         Returns:
-            输出文件路径
+            输出文件路径（输出到文件对象时返回空字符串）
         """
-        print("开始生成简历模板...")
-        
         # 按顺序填充各部分（顺序很重要，因为要正确计算行偏移）
-        print("  [1/6] 填充基本信息...")
-        self.fill_basic_info(resume_data)
-        
-        print("  [2/6] 填充个人信息...")
-        self.fill_personal_info(resume_data)
-        
-        print("  [3/6] 填充学历信息...")
-        self.fill_education(resume_data)
-        
-        print("  [4/6] 填充工作经历...")
-        self.fill_work_experience(resume_data)
-        
-        print("  [5/6] 填充项目经历...")
-        self.fill_project_experience(resume_data)
-        
-        print("  [6/6] 填充技术特长...")
-        self.fill_technical_skills(resume_data)
+        steps = (
+            ("填充基本信息", self.fill_basic_info),
+            ("填充个人信息", self.fill_personal_info),
+            ("填充学历信息", self.fill_education),
+            ("填充工作经历", self.fill_work_experience),
+            ("填充项目经历", self.fill_project_experience),
+            ("填充技术特长", self.fill_technical_skills),
+        )
         
-        # 保存文件
-        output_path = Path(output_path)
+        if verbose:
+            print("开始生成简历模板...")
+        for i, (label, fill) in enumerate(steps, 1):
+            if verbose:
+                print(f"  [{i}/{len(steps)}] {label}...")
+            fill(resume_data)
+        
+        # 保存文件（openpyxl 可直接写入文件对象，无需落盘）
+        if hasattr(output, "write"):
+            self.wb.save(output)
+            if verbose:
+                print("\n✅ 简历模板已生成")
+            return ""
+        
+        output_path = Path(output)
         self.wb.save(output_path)
-        print(f"\n✅ 简历模板已生成: {output_path}")
+        if verbose:
+            print(f"\n✅ 简历模板已生成: {output_path}")
         
         return str(output_path)
 
 
+def generate_excel_bytes(template_path: str, resume_data: dict) -> bytes:
+    """
+    生成填充后的简历 Excel 并返回文件内容
+    
+    模块级函数，参数和返回值都可以 pickle，可直接提交到进程池执行
+    
+    Args:
+        template_path: Excel模板文件路径
+        resume_data: 解析后的简历JSON数据
+        
+    Returns:
+        xlsx 文件内容
+    """
+    buffer = io.BytesIO()
+    ResumeTemplateGenerator(template_path).generate(resume_data, buffer)
+    return buffer.getvalue()
+
+
 def main():
     """主函数"""
     import sys
@@ -631,7 +738,7 @@ def main():
     # 生成模板
     print(f"使用模板: {template_path}")
     generator = ResumeTemplateGenerator(str(template_path))
-    generator.generate(resume_data, str(output_path))
+    generator.generate(resume_data, str(output_path), verbose=True)
     
     print("\n" + "=" * 60)
     print("生成完成！")